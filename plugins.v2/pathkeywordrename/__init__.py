@@ -1,8 +1,21 @@
+import json
 import os
+import re
 import threading
-from typing import Any, Dict, List, Tuple, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence, Set, Tuple, Optional
 
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+from app import schemas
 from app.core.event import Event, eventmanager
+from app.helper.directory import DirectoryHelper
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas.event import TransferRenameEventData
@@ -11,6 +24,354 @@ from app.schemas.types import ChainEventType
 lock = threading.Lock()
 
 
+class KeywordMatcher:
+    """
+    Aho-Corasick 多模式匹配器，一次扫描找出目录名中出现的关键字（序号越小优先级越高）
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = keywords
+        # 每个状态的转移表、失败指针、命中的全部关键字序号及其中最小的序号
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._hit: List[Optional[int]] = [None]
+        for index, keyword in enumerate(keywords):
+            if keyword:
+                self.__add(keyword, index)
+        self.__build()
+
+    def __add(self, keyword: str, index: int):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._hit.append(None)
+            state = next_state
+        self._out[state] += (index,)
+
+    def __build(self):
+        """
+        广度优先构建失败指针，并把后缀状态的命中合并到当前状态
+        """
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+        for state in queue:
+            self._out[state] += self._out[self._fail[state]]
+        self._hit = [min(out) if out else None for out in self._out]
+
+    def __step(self, state: int, char: str) -> int:
+        while state and char not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(char, 0)
+
+    def match(self, text: str) -> Optional[int]:
+        """
+        返回文本中出现的优先级最高的关键字序号，没有出现任何关键字时返回 None
+        """
+        best = None
+        state = 0
+        for char in text:
+            state = self.__step(state, char)
+            hit = self._hit[state]
+            if hit is not None and (best is None or hit < best):
+                best = hit
+                if best == 0:
+                    break
+        return best
+
+    def matches(self, text: str) -> Set[int]:
+        """
+        返回文本中出现的全部关键字序号
+        """
+        found = set()
+        state = 0
+        for char in text:
+            state = self.__step(state, char)
+            found.update(self._out[state])
+        return found
+
+
+class PathRule:
+    """
+    单条路径规则：关键字（子串匹配）、re:正则（搜索）或 glob:通配符（整段目录名匹配）。
+    自定义名可用 \\1、\\g<name> 引用捕获组，通配符的 * ? [...] 依次为捕获组
+    """
+
+    KEYWORD = "keyword"
+    REGEX = "re"
+    GLOB = "glob"
+
+    def __init__(self, kind: str, pattern: str, name: Optional[str] = None):
+        self.kind = kind
+        self.pattern = pattern
+        self.name = name
+        self.regex: Optional[re.Pattern] = None
+        if kind == self.REGEX:
+            self.regex = re.compile(pattern)
+            self.literal = self.__regex_literal(self.regex)
+        elif kind == self.GLOB:
+            source, self.literal = self.__translate_glob(pattern)
+            self.regex = re.compile(source)
+        else:
+            self.literal = pattern
+
+    @staticmethod
+    def __regex_literal(regex: re.Pattern) -> str:
+        """
+        取正则顶层必须出现的最长字面量，用于预筛选；无法确定时返回空串（总是参与验证）
+        """
+        if regex.flags & re.IGNORECASE:
+            return ''
+        try:
+            parsed = sre_parse.parse(regex.pattern, regex.flags)
+        except Exception:
+            return ''
+        best = run = ''
+        for op, av in parsed:
+            if op is sre_parse.LITERAL:
+                run += chr(av)
+            else:
+                best, run = max(best, run, key=len), ''
+        return max(best, run, key=len)
+
+    @staticmethod
+    def __translate_glob(pattern: str) -> Tuple[str, str]:
+        """
+        通配符转换为整段匹配的正则，通配部分转为捕获组，同时返回最长的字面量片段
+        """
+        parts = []
+        literals = ['']
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            end = pattern.find(']', i + 2) if char == '[' else -1
+            if char == '*':
+                parts.append('(.*)')
+            elif char == '?':
+                parts.append('(.)')
+            elif end != -1:
+                body = pattern[i + 1:end].replace('\\', '\\\\')
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append('([' + body + '])')
+                i = end
+            else:
+                parts.append(re.escape(char))
+                literals[-1] += char
+                i += 1
+                continue
+            literals.append('')
+            i += 1
+        return '(?s:' + ''.join(parts) + r')\Z', max(literals, key=len)
+
+    def apply(self, part: str) -> Optional[str]:
+        """
+        规则匹配目录名时返回附加到文件名的名称，否则返回 None
+        """
+        if self.regex is None:
+            return (self.name or part) if self.pattern in part else None
+        match = self.regex.match(part) if self.kind == self.GLOB else self.regex.search(part)
+        if not match:
+            return None
+        if not self.name:
+            return part
+        try:
+            return match.expand(self.name)
+        except (re.error, IndexError) as e:
+            logger.warn(f"路径规则 '{self.pattern}' 的自定义名 '{self.name}' 无效：{e}")
+            return None
+
+
+class RuleMatcher:
+    """
+    规则集合的组合匹配器：用各规则必需字面量构建的自动机一次扫描筛出候选，再按优先级验证候选规则，
+    规则增多时每个目录名只需验证少量候选
+    """
+
+    def __init__(self, rules: List[PathRule]):
+        self.rules = rules
+        self._literals = KeywordMatcher([rule.literal for rule in rules])
+        self._always = [index for index, rule in enumerate(rules) if not rule.literal]
+        self._keywords_only = all(rule.kind == PathRule.KEYWORD for rule in rules)
+
+    def match(self, part: str) -> Optional[Tuple[PathRule, str]]:
+        """
+        返回匹配目录名的优先级最高的规则及附加名称
+        """
+        if self._keywords_only:
+            index = self._literals.match(part)
+            return (self.rules[index], self.rules[index].apply(part)) if index is not None else None
+        candidates = self._literals.matches(part)
+        if self._always:
+            candidates.update(self._always)
+        for index in sorted(candidates):
+            suffix = self.rules[index].apply(part)
+            if suffix:
+                return self.rules[index], suffix
+        return None
+
+    def resolve(self, parts: Sequence[str]) -> Optional[Tuple[str, str]]:
+        """
+        从最深一级目录开始查找规则，返回 (规则, 附加到文件名的名称)
+        :param parts: 按层级排列的目录名
+        """
+        for part in reversed(parts):
+            matched = self.match(part)
+            if matched:
+                rule, suffix = matched
+                return rule.pattern, suffix
+        return None
+
+
+class RuleScopes:
+    """
+    按存储根目录划分的规则。根目录保存在按路径分段的前缀树中，每个根目录节点持有在其下生效的规则
+    （全局规则及上级、本级根目录的规则，保持配置顺序）编译出的匹配器，查找只需 O(路径深度)
+    """
+
+    def __init__(self, scoped_rules: List[Tuple[Optional[str], PathRule]]):
+        global_rules = [rule for scope, rule in scoped_rules if not self.split(scope)]
+        self._root: Dict[str, Any] = {"children": {}, "matcher": RuleMatcher(global_rules) if global_rules else None}
+        roots = dict.fromkeys(self.split(scope) for scope, _ in scoped_rules if self.split(scope))
+        # 配置中的各根目录，供批量操作校验目录范围
+        self.roots = list(dict.fromkeys(scope.rstrip("/\\") for scope, _ in scoped_rules if self.split(scope)))
+        for root in roots:
+            rules = [rule for scope, rule in scoped_rules if root[:len(self.split(scope))] == self.split(scope)]
+            node = self._root
+            for part in root:
+                node = node["children"].setdefault(part, {"children": {}, "matcher": None})
+            node["matcher"] = RuleMatcher(rules)
+
+    @staticmethod
+    def split(path: Optional[str]) -> Tuple[str, ...]:
+        return tuple(part for part in (path or '').replace("\\", "/").split("/") if part)
+
+    def lookup(self, parts: Sequence[str]) -> Tuple[Optional[RuleMatcher], int]:
+        """
+        返回路径所在的最深一级根目录的匹配器及该根目录的层数，不在任何根目录下时返回全局规则的匹配器和 0
+        """
+        node = self._root
+        matcher, depth = node["matcher"], 0
+        for index, part in enumerate(parts, start=1):
+            node = node["children"].get(part)
+            if node is None:
+                break
+            if node["matcher"]:
+                matcher, depth = node["matcher"], index
+        return matcher, depth
+
+    def resolve(self, dir_path: str) -> Optional[Tuple[str, str]]:
+        """
+        根目录下的规则只匹配根目录以下的目录名，根目录自身的各级目录名只由全局规则匹配
+        """
+        parts = self.split(dir_path)
+        matcher, depth = self.lookup(parts)
+        resolved = matcher.resolve(parts[depth:]) if matcher else None
+        if resolved or not depth or not self._root["matcher"]:
+            return resolved
+        return self._root["matcher"].resolve(parts[:depth])
+
+
+class RenameMetrics:
+    """
+    重命名处理统计：结果计数、各规则命中次数和单次处理耗时分布。
+    每个线程写自己的分片，处理事件时不加锁，读取时再汇总
+    """
+
+    # 单次处理耗时的分桶上限（秒）
+    LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+    OUTCOMES = ("renamed", "unchanged", "unmatched", "error")
+
+    def __init__(self):
+        self.started = time.time()
+        self._local = threading.local()
+        self._shards: List[Dict[str, Any]] = []
+        # 只在线程第一次记录时注册分片
+        self._lock = threading.Lock()
+
+    def __shard(self) -> Dict[str, Any]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {"outcomes": dict.fromkeys(self.OUTCOMES, 0), "rules": {},
+                     "counts": [0] * (len(self.LATENCY_BUCKETS) + 1), "sum": 0.0, "max": 0.0}
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, outcome: str, duration: float, rule: Optional[str] = None):
+        shard = self.__shard()
+        shard["outcomes"][outcome] += 1
+        if rule:
+            shard["rules"][rule] = shard["rules"].get(rule, 0) + 1
+        index = next((i for i, bound in enumerate(self.LATENCY_BUCKETS) if duration <= bound),
+                     len(self.LATENCY_BUCKETS))
+        shard["counts"][index] += 1
+        shard["sum"] += duration
+        if duration > shard["max"]:
+            shard["max"] = duration
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            shards = list(self._shards)
+        outcomes = dict.fromkeys(self.OUTCOMES, 0)
+        rules: Dict[str, int] = {}
+        counts = [0] * (len(self.LATENCY_BUCKETS) + 1)
+        total_time, max_time = 0.0, 0.0
+        for shard in shards:
+            for outcome, value in list(shard["outcomes"].items()):
+                outcomes[outcome] += value
+            for rule, value in list(shard["rules"].items()):
+                rules[rule] = rules.get(rule, 0) + value
+            counts = [a + b for a, b in zip(counts, shard["counts"])]
+            total_time += shard["sum"]
+            max_time = max(max_time, shard["max"])
+        total = sum(counts)
+        latency = {"count": total, "avg_ms": round(total_time / total * 1000, 3) if total else None,
+                   "max_ms": round(max_time * 1000, 3),
+                   "buckets": dict(zip([f"{bound * 1000:g}ms" for bound in self.LATENCY_BUCKETS] + ["+Inf"], counts))}
+        # P50/P95 取所在分桶的上限，不超过最大值
+        for name, ratio in (("p50_ms", 0.5), ("p95_ms", 0.95)):
+            latency[name] = None
+            cumulative = 0
+            for bound, count in zip(list(self.LATENCY_BUCKETS) + [max_time], counts):
+                cumulative += count
+                if total and cumulative >= total * ratio:
+                    latency[name] = round(min(bound, max_time) * 1000, 3)
+                    break
+        return {
+            "since": datetime.fromtimestamp(self.started).strftime("%Y-%m-%d %H:%M:%S"),
+            "events": total,
+            "outcomes": outcomes,
+            "rules": dict(sorted(rules.items(), key=lambda item: item[1], reverse=True)),
+            "latency": latency,
+        }
+
+
+class RuleSnapshot(NamedTuple):
+    """
+    一次配置编译出的不可变规则快照。重新配置时整体替换，事件处理只读取一次引用，无需加锁
+    """
+    enabled: bool
+    separator: str
+    rules: Tuple[PathRule, ...]
+    scopes: Optional[RuleScopes]
+    # 目录 -> 匹配结果的 LRU 缓存，随快照一起重建
+    resolve: Optional[Callable[[str], Optional[Tuple[str, str]]]]
+
+
 class PathKeywordRename(_PluginBase):
     # 插件名称
     plugin_name = "路径关键字重命名"
@@ -19,7 +380,7 @@ class PathKeywordRename(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/shanhai2333/MoviePilot-Plugins/main/icons/pathkeywordrename.png"
     # 插件版本
-    plugin_version = "2.1.2"
+    plugin_version = "2.5.1"
     # 插件作者
     plugin_author = "shanhai2333"
     # 作者主页
@@ -30,6 +391,17 @@ class PathKeywordRename(_PluginBase):
     plugin_order = 43
     # 可使用的用户级别
     auth_level = 1
+    # 目录匹配结果缓存的最大条数
+    RESOLVE_CACHE_SIZE = 1024
+    # 批量重命名：扫描与执行的并发数、每批执行的文件数、预览默认每页条数
+    BULK_WORKERS = 8
+    BULK_BATCH = 500
+    PAGE_SIZE = 100
+    # 停止插件时等待批量任务退出的最长时间（秒）
+    BULK_STOP_TIMEOUT = 10
+    # 媒体文件扩展名，以媒体文件名为前缀的字幕、nfo、图片随之重命名
+    MEDIA_EXTENSIONS = ('.mkv', '.mp4', '.avi', '.ts', '.m2ts', '.rmvb', '.wmv', '.mov', '.flv', '.webm', '.iso',
+                        '.strm')
 
     # region 私有属性
     # 是否开启
@@ -38,6 +410,18 @@ class PathKeywordRename(_PluginBase):
     _path_keyword: Optional[str] = None
     # 路径关键字分隔符
     _path_keyword_separator: Optional[str] = " - "
+    # 正则/通配符规则，每行一条
+    _path_rules: Optional[str] = None
+    # 当前生效的规则快照，路径关键字在前、规则行在后，按顺序决定优先级
+    _snapshot = RuleSnapshot(enabled=False, separator=" - ", rules=(), scopes=None, resolve=None)
+    # 最近一次批量预览的结果，供分页和执行复用
+    _preview: Optional[Dict[str, Any]] = None
+    # 批量执行/回滚任务
+    _bulk_thread: Optional[threading.Thread] = None
+    _bulk_stop = threading.Event()
+    _bulk_state: Dict[str, Any] = {}
+    # 处理统计，重新配置时保留
+    _metrics: Optional[RenameMetrics] = None
 
     # endregion
 
@@ -45,19 +429,345 @@ class PathKeywordRename(_PluginBase):
         if not config:
             return
 
-        self._enabled = config.get("enabled") or False
-        self._path_keyword = config.get("path_keyword")
-        self._path_keyword_separator = config.get("path_keyword_separator") or " - "
+        if not self._metrics:
+            self._metrics = RenameMetrics()
+        # 先在锁外编译好完整快照，再一次性替换引用；锁只用于串行化并发的重新配置
+        enabled = config.get("enabled") or False
+        separator = config.get("path_keyword_separator") or " - "
+        scoped_rules = [(None, rule) for rule in self.__parse_keywords(config.get("path_keyword"))] \
+            + self.__parse_rules(config.get("path_rules"))
+        scopes = RuleScopes(scoped_rules) if scoped_rules else None
+        snapshot = RuleSnapshot(enabled=enabled, separator=separator, rules=tuple(rule for _, rule in scoped_rules),
+                                scopes=scopes,
+                                resolve=lru_cache(maxsize=self.RESOLVE_CACHE_SIZE)(scopes.resolve) if scopes else None)
+        with lock:
+            self._enabled = enabled
+            self._path_keyword = config.get("path_keyword")
+            self._path_keyword_separator = separator
+            self._path_rules = config.get("path_rules")
+            self._snapshot = snapshot
 
     def get_state(self) -> bool:
         return self._enabled
 
+    @staticmethod
+    def __parse_keywords(path_keyword: Optional[str]) -> List[PathRule]:
+        """
+        解析路径关键字配置，格式：关键字1:自定义名1,关键字2，保持配置顺序作为优先级
+        """
+        rules = []
+        for pair in (path_keyword or '').split(','):
+            pair = pair.strip()
+            if not pair:
+                continue
+            if ':' in pair:
+                keyword, custom_name = pair.split(':', 1)
+                rules.append(PathRule(PathRule.KEYWORD, keyword.strip(), custom_name.strip() or None))
+            else:
+                rules.append(PathRule(PathRule.KEYWORD, pair))
+        return rules
+
+    @staticmethod
+    def __parse_rules(path_rules: Optional[str]) -> List[Tuple[Optional[str], PathRule]]:
+        """
+        解析规则行，格式：[re:|glob:]模式 => 自定义名，无前缀为关键字，自定义名可省略，# 开头为注释。
+        [/media/anime] 这样的行开始一个根目录分组，其后的规则只对该目录下的文件生效，[/] 回到全局
+        """
+        rules = []
+        scope = None
+        for line in (path_rules or '').splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                scope = line[1:-1].strip() or None
+                continue
+            pattern, _, custom_name = line.partition('=>')
+            pattern = pattern.strip()
+            kind = PathRule.KEYWORD
+            for prefix in (PathRule.REGEX, PathRule.GLOB):
+                if pattern.startswith(f"{prefix}:"):
+                    kind = prefix
+                    pattern = pattern[len(prefix) + 1:].strip()
+                    break
+            if not pattern:
+                continue
+            try:
+                rules.append((scope, PathRule(kind, pattern, custom_name.strip() or None)))
+            except re.error as e:
+                logger.warn(f"路径规则 '{line}' 无效，已忽略：{e}")
+        return rules
+
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/preview",
+                "endpoint": self.api_preview,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "批量重命名预览",
+                "description": "按当前规则遍历媒体库或规则根目录下的已有目录，分页返回原文件名与新文件名",
+            },
+            {
+                "path": "/apply",
+                "endpoint": self.api_apply,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "执行批量重命名",
+                "description": "后台分批并发重命名目录下的文件，并写入回滚日志",
+            },
+            {
+                "path": "/rollback",
+                "endpoint": self.api_rollback,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "回滚批量重命名",
+                "description": "按回滚日志把文件名改回原样，未指定日志时回滚最近一次",
+            },
+            {
+                "path": "/bulk_status",
+                "endpoint": self.api_bulk_status,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "批量任务进度",
+                "description": "查询批量重命名或回滚任务的进度",
+            },
+            {
+                "path": "/metrics",
+                "endpoint": self.api_metrics,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "处理统计",
+                "description": "各规则命中次数、目录缓存命中率及单次重命名处理耗时分布",
+            }
+        ]
+
+    def api_metrics(self) -> schemas.Response:
+        return schemas.Response(success=True, data=self.__metrics())
+
+    def __metrics(self) -> Dict[str, Any]:
+        metrics = self._metrics.snapshot() if self._metrics else {}
+        resolve = self._snapshot.resolve
+        info = resolve.cache_info() if resolve else None
+        lookups = info.hits + info.misses if info else 0
+        # 目录缓存随配置重建，命中率只统计当前配置生效以来的查询
+        metrics["cache"] = {
+            "hits": info.hits if info else 0,
+            "misses": info.misses if info else 0,
+            "size": info.currsize if info else 0,
+            "max_size": self.RESOLVE_CACHE_SIZE,
+            "hit_rate": round(info.hits / lookups, 4) if lookups else None,
+        }
+        return metrics
+
+    def __bulk_root(self, path: str, snapshot: RuleSnapshot) -> Tuple[Optional[str], Optional[str]]:
+        """
+        校验批量操作的目录，返回 (规范化后的目录, 错误信息)：
+        必须是已存在的绝对路径且不能是文件系统根目录，配置了媒体库目录或规则根目录时必须位于其中
+        """
+        if not snapshot.scopes:
+            return None, '未配置路径关键字或规则'
+        root = os.path.normpath(path) if path else ''
+        if not root or not os.path.isabs(root) or os.path.dirname(root) == root:
+            return None, f'请指定媒体库下的目录：{path}'
+        if not os.path.isdir(root):
+            return None, f'目录不存在：{path}'
+        allowed = [os.path.normpath(str(conf.library_path)) for conf in DirectoryHelper().get_library_dirs()
+                   if conf.library_path] + [os.path.normpath(scope) for scope in snapshot.scopes.roots]
+        if allowed and not any(os.path.commonpath([root, base]) == base for base in allowed):
+            return None, f'目录不在媒体库或规则根目录中：{path}'
+        return root, None
+
+    def api_preview(self, path: str, page: int = 1, size: int = PAGE_SIZE) -> schemas.Response:
+        snapshot = self._snapshot
+        root, error = self.__bulk_root(path, snapshot)
+        if error:
+            return schemas.Response(success=False, message=error)
+        page, size = max(1, int(page)), max(1, int(size))
+        preview = self._preview
+        # 第一页总是重新扫描，翻页时复用同一次扫描的结果
+        if page == 1 or not preview or preview["root"] != root or preview["snapshot"] is not snapshot:
+            preview = {"root": root, "snapshot": snapshot, "renames": self.__plan_tree(root, snapshot)}
+            self._preview = preview
+        renames = preview["renames"]
+        return schemas.Response(success=True, data={
+            "root": root,
+            "total": len(renames),
+            "page": page,
+            "size": size,
+            "items": [{"old": os.path.relpath(old, root), "new": os.path.relpath(new, root)}
+                      for old, new in renames[(page - 1) * size:page * size]],
+        })
+
+    def api_apply(self, path: str) -> schemas.Response:
+        snapshot = self._snapshot
+        root, error = self.__bulk_root(path, snapshot)
+        if error:
+            return schemas.Response(success=False, message=error)
+        journal = self.get_data_path() / f"rename-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+        preview = self._preview
+        renames = preview["renames"] if preview and preview["root"] == root \
+            and preview["snapshot"] is snapshot else None
+        if not self.__start_bulk("apply", self.__run_apply, root, snapshot, renames, journal):
+            return schemas.Response(success=False, message='已有批量任务正在执行')
+        return schemas.Response(success=True, message=f'开始批量重命名 {root}', data={"journal": journal.name})
+
+    def api_rollback(self, journal: str = '') -> schemas.Response:
+        journals = sorted(self.get_data_path().glob("rename-*.jsonl"))
+        if journal:
+            journals = [item for item in journals if item.name == journal]
+        if not journals:
+            return schemas.Response(success=False, message='没有可回滚的日志')
+        if not self.__start_bulk("rollback", self.__run_rollback, journals[-1]):
+            return schemas.Response(success=False, message='已有批量任务正在执行')
+        return schemas.Response(success=True, message=f'开始回滚 {journals[-1].name}',
+                                data={"journal": journals[-1].name})
+
+    def api_bulk_status(self) -> schemas.Response:
+        return schemas.Response(success=True, data=dict(self._bulk_state))
+
+    def __plan_directory(self, dir_path: str, snapshot: RuleSnapshot) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """
+        扫描单个目录，返回 (该目录下需要重命名的 (原路径, 新路径), 子目录)
+        """
+        files, subdirs = [], []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    files.append(entry.name)
+        # 批量扫描每个目录只访问一次，不经过目录缓存，避免挤占缓存并干扰重命名事件的命中率统计
+        resolved = snapshot.scopes.resolve(dir_path.replace("\\", "/")) if files else None
+        if not resolved:
+            return [], subdirs
+        tail = f"{snapshot.separator}{resolved[1]}"
+        # 长的文件名优先，避免 E01 误匹配 E010 的字幕
+        stems = sorted({os.path.splitext(name)[0] for name in files
+                        if os.path.splitext(name)[1].lower() in self.MEDIA_EXTENSIONS}, key=len, reverse=True)
+        renames = []
+        for name in files:
+            for stem in stems:
+                rest = name[len(stem):]
+                if not name.startswith(stem) or (rest[:1].isalnum()):
+                    continue
+                # 已经附加过的文件保持不变
+                if not stem.endswith(tail):
+                    renames.append((os.path.join(dir_path, name), os.path.join(dir_path, f"{stem}{tail}{rest}")))
+                break
+        return renames, subdirs
+
+    def __plan_tree(self, root: str, snapshot: RuleSnapshot,
+                    stop: Optional[threading.Event] = None) -> Optional[List[Tuple[str, str]]]:
+        """
+        并发逐层扫描目录树，返回按原路径排序的重命名计划；传入的 stop 被置位时中断扫描并返回 None
+        """
+        renames = []
+        with ThreadPoolExecutor(max_workers=self.BULK_WORKERS) as pool:
+            pending = {pool.submit(self.__plan_directory, root, snapshot)}
+            while pending:
+                if stop and stop.is_set():
+                    for future in pending:
+                        future.cancel()
+                    logger.info("插件停止，目录扫描中断")
+                    return None
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        found, subdirs = future.result()
+                    except OSError as e:
+                        logger.warn(f"扫描目录失败：{e}")
+                        continue
+                    renames.extend(found)
+                    pending.update(pool.submit(self.__plan_directory, subdir, snapshot) for subdir in subdirs)
+        renames.sort()
+        return renames
+
+    def __start_bulk(self, kind: str, target, *args) -> bool:
+        with lock:
+            if self._bulk_thread and self._bulk_thread.is_alive():
+                return False
+            self._bulk_stop.clear()
+            self._bulk_state = {"kind": kind, "running": True, "total": 0, "done": 0, "failed": 0, "errors": []}
+            self._bulk_thread = threading.Thread(target=target, args=args, daemon=True)
+            self._bulk_thread.start()
+            return True
+
+    def __rename_batches(self, pairs: List[Tuple[str, str]]):
+        """
+        分批并发重命名，目标已存在时跳过，停止插件时在批次之间退出
+        """
+        state = self._bulk_state
+        state["total"] = len(pairs)
+
+        def rename(pair: Tuple[str, str]) -> Optional[str]:
+            source, target = pair
+            if os.path.exists(target):
+                return f"目标已存在：{target}"
+            try:
+                os.rename(source, target)
+            except OSError as e:
+                return f"{source}：{e}"
+            return None
+
+        with ThreadPoolExecutor(max_workers=self.BULK_WORKERS) as pool:
+            for start in range(0, len(pairs), self.BULK_BATCH):
+                if self._bulk_stop.is_set():
+                    logger.info("插件停止，批量任务中断")
+                    break
+                batch = pairs[start:start + self.BULK_BATCH]
+                errors = [error for error in pool.map(rename, batch) if error]
+                state["done"] += len(batch) - len(errors)
+                state["failed"] += len(errors)
+                state["errors"] = (state["errors"] + errors)[-20:]
+
+    def __run_apply(self, root: str, snapshot: RuleSnapshot, renames: Optional[List[Tuple[str, str]]], journal):
+        try:
+            if renames is None:
+                renames = self.__plan_tree(root, snapshot, self._bulk_stop)
+                if renames is None:
+                    return
+            # 先完整写入回滚日志再开始重命名，中途失败也能回滚
+            with open(journal, "w", encoding="utf-8") as f:
+                for old, new in renames:
+                    f.write(json.dumps({"old": old, "new": new}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._bulk_state["journal"] = journal.name
+            self.__rename_batches(renames)
+            self._preview = None
+            logger.info(f"批量重命名完成：{root}，成功 {self._bulk_state['done']} 个，"
+                        f"失败 {self._bulk_state['failed']} 个，回滚日志 {journal.name}")
+        except Exception as e:
+            logger.error(f"批量重命名异常：{e}", exc_info=True)
+            self._bulk_state["errors"].append(str(e))
+        finally:
+            self._bulk_state["running"] = False
+
+    def __run_rollback(self, journal):
+        try:
+            pairs = []
+            with open(journal, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        pairs.append((entry["new"], entry["old"]))
+            self._bulk_state["journal"] = journal.name
+            # 只回滚实际改过名的文件：新文件存在且原文件名未被占用
+            self.__rename_batches([(new, old) for new, old in pairs
+                                   if os.path.exists(new) and not os.path.exists(old)])
+            self._preview = None
+            logger.info(f"批量重命名已回滚：{journal.name}，成功 {self._bulk_state['done']} 个，"
+                        f"失败 {self._bulk_state['failed']} 个")
+        except Exception as e:
+            logger.error(f"回滚批量重命名异常：{e}", exc_info=True)
+            self._bulk_state["errors"].append(str(e))
+        finally:
+            self._bulk_state["running"] = False
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -113,6 +823,31 @@ class PathKeywordRename(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'path_rules',
+                                            'label': '路径规则',
+                                            'rows': 4,
+                                            'placeholder': 're:^Season (\\d+)$ => S\\1\n[/media/anime]\nglob:*剧场版* => 剧场版\n特别篇',
+                                            'hint': '每行一条：[re:|glob:]模式 => 自定义名。re: 为正则，glob: 为通配符（* ? [...] 依次为捕获组），无前缀为关键字；自定义名可用 \\1 引用捕获组，省略时使用目录名。[/media/anime] 行之后的规则只作用于该目录，[/] 回到全局。路径关键字优先，其余按行顺序',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -141,17 +876,165 @@ class PathKeywordRename(_PluginBase):
         ], {
             "enabled": False,
             "path_keyword": "",
+            "path_rules": "",
             "path_keyword_separator": " - "
         }
 
     def get_page(self) -> List[dict]:
-        pass
+        """
+        处理统计面板
+        """
+        metrics = self.__metrics()
+        outcomes = metrics.get("outcomes") or {}
+        latency = metrics.get("latency") or {}
+        cache = metrics.get("cache") or {}
+
+        def milliseconds(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value:g}ms"
+
+        def stat_card(title: str, value: Any) -> dict:
+            return {
+                'component': 'VCol',
+                'props': {
+                    'cols': 6,
+                    'md': 3
+                },
+                'content': [
+                    {
+                        'component': 'VCard',
+                        'props': {
+                            'variant': 'tonal'
+                        },
+                        'content': [
+                            {
+                                'component': 'VCardText',
+                                'content': [
+                                    {
+                                        'component': 'div',
+                                        'props': {
+                                            'class': 'text-caption'
+                                        },
+                                        'text': title
+                                    },
+                                    {
+                                        'component': 'div',
+                                        'props': {
+                                            'class': 'text-h6'
+                                        },
+                                        'text': str(value)
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+
+        def table(headers: List[str], rows: List[List[Any]]) -> dict:
+            return {
+                'component': 'VTable',
+                'props': {
+                    'hover': True,
+                    'density': 'compact'
+                },
+                'content': [
+                    {
+                        'component': 'thead',
+                        'content': [
+                            {
+                                'component': 'tr',
+                                'content': [{'component': 'th', 'text': header} for header in headers]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'tbody',
+                        'content': [
+                            {
+                                'component': 'tr',
+                                'content': [{'component': 'td', 'text': str(cell)} for cell in row]
+                            } for row in rows
+                        ]
+                    }
+                ]
+            }
+
+        hit_rate = cache.get("hit_rate")
+        rule_rows = [[rule, hits] for rule, hits in (metrics.get("rules") or {}).items()]
+        bucket_rows = [[bound, count] for bound, count in (latency.get("buckets") or {}).items()]
+
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    stat_card('处理事件', metrics.get("events", 0)),
+                    stat_card('已重命名', outcomes.get("renamed", 0)),
+                    stat_card('未匹配 / 结果相同', f'{outcomes.get("unmatched", 0)} / {outcomes.get("unchanged", 0)}'),
+                    stat_card('异常', outcomes.get("error", 0)),
+                    stat_card('平均耗时', milliseconds(latency.get("avg_ms"))),
+                    stat_card('P95耗时', milliseconds(latency.get("p95_ms"))),
+                    stat_card('最大耗时', milliseconds(latency.get("max_ms"))),
+                    stat_card('目录缓存命中率', '-' if hit_rate is None else f'{hit_rate:.1%}'),
+                ]
+            },
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12
+                        },
+                        'content': [
+                            {
+                                'component': 'VAlert',
+                                'props': {
+                                    'type': 'info',
+                                    'variant': 'tonal',
+                                    'text': f'统计开始于 {metrics.get("since", "-")}。耗时为单次转移重命名事件在本插件内的处理时间；'
+                                            f'目录缓存 {cache.get("size", 0)}/{cache.get("max_size", 0)} 条，'
+                                            f'命中 {cache.get("hits", 0)} 次，未命中 {cache.get("misses", 0)} 次（修改配置后重新统计）。'
+                                }
+                            }
+                        ]
+                    }
+                ]
+            },
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 7
+                        },
+                        'content': [
+                            table(['规则', '命中次数'], rule_rows)
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 5
+                        },
+                        'content': [
+                            table(['耗时不超过', '事件数'], bucket_rows)
+                        ]
+                    }
+                ]
+            }
+        ]
 
     def get_service(self) -> List[Dict[str, Any]]:
         pass
 
     def stop_service(self):
-        pass
+        self._bulk_stop.set()
+        if self._bulk_thread and self._bulk_thread.is_alive():
+            # 扫描和重命名都会在当前目录或批次结束后检查停止信号
+            self._bulk_thread.join(timeout=self.BULK_STOP_TIMEOUT)
 
     @eventmanager.register(ChainEventType.TransferRename)
     def handle_transfer_rename(self, event: Event):
@@ -159,7 +1042,9 @@ class PathKeywordRename(_PluginBase):
         处理 TransferRename 事件
         :param event: 事件数据
         """
-        if not self._enabled or not event or not event.event_data:
+        # 整个处理过程只使用同一份快照，重新配置不会影响处理中的事件
+        snapshot = self._snapshot
+        if not snapshot.enabled or not event or not event.event_data:
             return
 
         event_data: TransferRenameEventData = event.event_data
@@ -168,53 +1053,42 @@ class PathKeywordRename(_PluginBase):
             logger.debug(f"该事件已被其他事件处理器处理，跳过后续操作")
             return
 
+        started = time.perf_counter()
+        # 处理结果与命中的规则，用于统计
+        outcome, keyword = None, None
         try:
             updated_str = event.event_data.render_str
 
             # 路径关键字处理
-            if self._path_keyword and hasattr(event.event_data, 'path') and event.event_data.path:
-                logger.debug(f"路径关键字功能已启用，关键字: '{self._path_keyword}', 目标路径: '{event.event_data.path}'")
+            if snapshot.scopes and hasattr(event.event_data, 'path') and event.event_data.path:
+                logger.debug(f"路径关键字功能已启用，规则数: {len(snapshot.rules)}, 目标路径: '{event.event_data.path}'")
 
-                keyword_pairs_str = [k.strip() for k in self._path_keyword.split(',') if k.strip()]
-                if not keyword_pairs_str:
+                # 获取目录路径，同一目录下的文件（如整季）只扫描一次
+                dir_path = os.path.dirname(str(event.event_data.path)).replace("\\", "/")
+                resolved = snapshot.resolve(dir_path)
+                if not resolved:
+                    outcome = "unmatched"
                     return
 
-                # Preserve order for prioritization
-                ordered_keywords = []
-                for pair in keyword_pairs_str:
-                    if ':' in pair:
-                        keyword, custom_name = pair.split(':', 1)
-                        ordered_keywords.append((keyword.strip(), custom_name.strip()))
-                    else:
-                        ordered_keywords.append((pair.strip(), None))
-                
-                # 获取目录路径
-                dir_path = os.path.dirname(event.event_data.path)
-                # 分割路径
-                path_parts = dir_path.replace("\\", "/").split("/")
-                
-                for part in reversed(path_parts):
-                    for keyword, custom_name in ordered_keywords:
-                        if keyword in part:
-                            logger.info(f"在路径中找到关键字 '{keyword}' 于目录 '{part}'。")
-                            name, ext = os.path.splitext(updated_str)
-                            if custom_name:
-                                separator = self._path_keyword_separator or ' - '
-                                updated_str = f"{name}{separator}{custom_name}{ext}"
-                                logger.info(f"使用自定义命名 '{custom_name}'。")
-                            else:
-                                separator = self._path_keyword_separator or ' - '
-                                updated_str = f"{name}{separator}{part}{ext}"
-                                logger.debug(f"附加目录名后的字符串: {updated_str}")
-                            
-                            if updated_str and updated_str != event.event_data.render_str:
-                                event.event_data.updated_str = updated_str
-                                event.event_data.updated = True
-                                event.event_data.source = self.plugin_name
-                                logger.info(f"重命名完成，{event.event_data.render_str} -> {updated_str}")
-                            else:
-                                logger.debug(f"重命名结果与原始值相同，跳过更新")
-                            return # Exit after first match
+                keyword, suffix = resolved
+                logger.info(f"在路径中匹配到规则 '{keyword}'，附加名称 '{suffix}'。")
+                name, ext = os.path.splitext(updated_str)
+                updated_str = f"{name}{snapshot.separator}{suffix}{ext}"
+                logger.debug(f"附加目录名后的字符串: {updated_str}")
+
+                if updated_str and updated_str != event.event_data.render_str:
+                    event.event_data.updated_str = updated_str
+                    event.event_data.updated = True
+                    event.event_data.source = self.plugin_name
+                    logger.info(f"重命名完成，{event.event_data.render_str} -> {updated_str}")
+                    outcome = "renamed"
+                else:
+                    logger.debug(f"重命名结果与原始值相同，跳过更新")
+                    outcome = "unchanged"
 
         except Exception as e:
-            logger.error(f"重命名发生未知异常: {e}", exc_info=True)
\ No newline at end of file
+            outcome = "error"
+            logger.error(f"重命名发生未知异常: {e}", exc_info=True)
+        finally:
+            if outcome and self._metrics:
+                self._metrics.observe(outcome, time.perf_counter() - started, keyword)
\ No newline at end of file
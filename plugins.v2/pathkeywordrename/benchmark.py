@@ -0,0 +1,127 @@
+"""
+PathKeywordRename 吞吐量基准测试
+
+按指定的规则数量与类型、路径深度和目录分布生成合成的 TransferRenameEventData，
+直接调用 handle_transfer_rename，统计每秒处理事件数、单次耗时、规则命中与目录缓存命中率。
+
+在 MoviePilot 根目录执行：
+    python -m app.plugins.pathkeywordrename.benchmark --rules 500 --depth 6 --events 100000
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.core.event import Event
+from app.schemas.event import TransferRenameEventData
+
+from . import PathKeywordRename
+
+
+def build_rules(count: int, regex_ratio: float, glob_ratio: float, scopes: int) -> Tuple[str, List[str]]:
+    """
+    生成规则行：按比例混合关键字、正则和通配符规则，可分散到多个根目录分组，同时返回每条规则对应的能命中的目录名
+    """
+    lines, samples = [], []
+    for index in range(count):
+        if scopes and index % max(1, count // scopes) == 0:
+            lines.append(f"[/media/lib{index // max(1, count // scopes) % scopes}]")
+        roll = random.random()
+        if roll < regex_ratio:
+            lines.append(f"re:^Show{index} S(\\d+)$ => R{index}_\\1")
+            samples.append(f"Show{index} S{random.randint(1, 9)}")
+        elif roll < regex_ratio + glob_ratio:
+            lines.append(f"glob:*Tag{index}-* => G{index}_\\1")
+            samples.append(f"x Tag{index}-y")
+        else:
+            lines.append(f"Key{index}. => K{index}")
+            samples.append(f"Key{index}. z")
+    return "\n".join(lines), samples
+
+
+def build_paths(count: int, depth: int, samples: List[str], hit_ratio: float, scopes: int) -> List[str]:
+    """
+    生成目标目录：约 hit_ratio 的目录名包含某条规则可匹配的内容，其余为无关目录名
+    """
+    paths = []
+    per_scope = max(1, len(samples) // scopes) if scopes else len(samples)
+    for index in range(count):
+        parts = [f"Folder{level}-{random.randint(0, 999)}" for level in range(max(0, depth - 3))]
+        scope = index % scopes if scopes else None
+        if random.random() < hit_ratio:
+            rule = random.randrange(len(samples))
+            # 命中的目录放到该规则所在的根目录下
+            scope = rule // per_scope % scopes if scopes else None
+            parts.append(samples[rule])
+        else:
+            parts.append(f"Plain {index}")
+        paths.append("/".join([f"/media/lib{scope}" if scopes else "/media/library"] + parts))
+    return paths
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    random.seed(args.seed)
+    path_rules, samples = build_rules(args.rules, args.regex_ratio, args.glob_ratio, args.scopes)
+    plugin = PathKeywordRename()
+    plugin.init_plugin({
+        "enabled": True,
+        "path_keyword": "",
+        "path_rules": path_rules,
+        "path_keyword_separator": " - ",
+    })
+    directories = build_paths(args.dirs, args.depth, samples, args.hit_ratio, args.scopes)
+    # 同一目录连续转移多个文件，模拟整季入库
+    events = [(directories[(index // args.files_per_dir) % len(directories)], f"Episode {index}.mkv")
+              for index in range(args.events)]
+
+    def worker(items):
+        for directory, name in items:
+            plugin.handle_transfer_rename(Event(event_data=TransferRenameEventData(
+                template_string="", rename_dict={}, render_str=name, path=f"{directory}/{name}")))
+
+    chunks = [events[index::args.threads] for index in range(args.threads)]
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    metrics = plugin.api_metrics().data
+    rules = metrics.pop("rules", {})
+    metrics["rules_hit"] = len(rules)
+    metrics["top_rules"] = dict(list(rules.items())[:5])
+    return {
+        "events": args.events,
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(args.events / elapsed, 1) if elapsed else None,
+        "metrics": metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PathKeywordRename 吞吐量基准测试")
+    parser.add_argument("--events", type=int, default=50000, help="处理的事件数量")
+    parser.add_argument("--rules", type=int, default=200, help="规则数量")
+    parser.add_argument("--regex-ratio", type=float, default=0.3, help="正则规则所占比例")
+    parser.add_argument("--glob-ratio", type=float, default=0.2, help="通配符规则所占比例")
+    parser.add_argument("--scopes", type=int, default=0, help="把规则分散到的根目录数量，0 表示全部为全局规则")
+    parser.add_argument("--depth", type=int, default=6, help="目标路径的目录层数")
+    parser.add_argument("--dirs", type=int, default=2000, help="不同目标目录的数量")
+    parser.add_argument("--files-per-dir", type=int, default=12, help="每个目录连续转移的文件数")
+    parser.add_argument("--hit-ratio", type=float, default=0.8, help="能匹配到规则的目录比例")
+    parser.add_argument("--threads", type=int, default=4, help="并发处理事件的线程数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--verbose", action="store_true", help="保留插件日志输出（默认关闭以免日志开销掩盖匹配耗时）")
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    print(json.dumps(run(args), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,22 @@
+import heapq
+import itertools
+import struct
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from urllib.parse import quote
+from urllib.parse import quote, unquote
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
+from app import schemas
 from app.utils.http import RequestUtils
 from app.core.config import settings
 from app.plugins import _PluginBase
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, Callable, List, Dict, Tuple, Optional
 from app.log import logger
 import xml.dom.minidom
 from app.utils.dom import DomUtils
@@ -46,8 +52,127 @@ def retry(ExceptionToCheck: Any,
     return deco_retry
 
 
+# MP4 编码标识到 NFO 编码名称的映射
+MP4_CODECS = {
+    'avc1': 'h264', 'avc3': 'h264', 'hev1': 'hevc', 'hvc1': 'hevc', 'av01': 'av1', 'vp09': 'vp9',
+    'mp4a': 'aac', 'ac-3': 'ac3', 'ec-3': 'eac3', 'Opus': 'opus', 'fLaC': 'flac',
+}
+# 需要继续深入解析的容器 box
+MP4_CONTAINER_BOXES = (b'moov', b'trak', b'mdia', b'minf', b'stbl')
+
+
+def _iter_mp4_boxes(data: bytes, start: int = 0, end: int = None):
+    """
+    遍历 [start, end) 范围内的 MP4 box，返回 (类型, 内容起点, 内容终点)；越界的 box 终点会超出 end
+    """
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack('>I4s', data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack('>Q', data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def _parse_mp4_moov(data: bytes, start: int, end: int) -> Dict[str, Any]:
+    """
+    从 moov box 中解析时长、分辨率和音视频编码
+    """
+    info: Dict[str, Any] = {}
+    track: Dict[str, Any] = {}
+
+    def walk(box_start: int, box_end: int):
+        for box_type, body, body_end in _iter_mp4_boxes(data, box_start, box_end):
+            if body_end > box_end:
+                return
+            if box_type == b'mvhd':
+                if data[body] == 1:
+                    timescale, duration = struct.unpack('>IQ', data[body + 20:body + 32])
+                else:
+                    timescale, duration = struct.unpack('>II', data[body + 12:body + 20])
+                if timescale:
+                    info['duration'] = round(duration / timescale)
+            elif box_type == b'tkhd':
+                width, height = struct.unpack('>II', data[body_end - 8:body_end])
+                track['width'], track['height'] = width >> 16, height >> 16
+            elif box_type == b'hdlr':
+                track['handler'] = data[body + 8:body + 12]
+            elif box_type == b'stsd' and body + 16 <= body_end:
+                fourcc = data[body + 12:body + 16].decode('latin-1')
+                track['codec'] = MP4_CODECS.get(fourcc, fourcc.strip().lower())
+                if body + 34 <= body_end:
+                    track['channels'] = struct.unpack('>H', data[body + 32:body + 34])[0]
+            elif box_type in MP4_CONTAINER_BOXES:
+                if box_type == b'trak':
+                    track.clear()
+                walk(body, body_end)
+                if box_type == b'trak':
+                    if track.get('handler') == b'vide' and 'video' not in info:
+                        info['video'] = {key: track.get(key) for key in ('codec', 'width', 'height')}
+                    elif track.get('handler') == b'soun' and 'audio' not in info:
+                        info['audio'] = {key: track.get(key) for key in ('codec', 'channels')}
+
+    walk(start, end)
+    return info
+
+
+def parse_mp4_head(data: bytes) -> Tuple[Optional[Dict[str, Any]], bool, Optional[int]]:
+    """
+    解析文件头部数据，返回 (媒体信息, moov 是否位于文件尾部, moov 未读完时需要读取到的字节数)
+    """
+    for box_type, body, body_end in _iter_mp4_boxes(data):
+        if box_type == b'moov':
+            if body_end > len(data):
+                return None, False, body_end
+            return _parse_mp4_moov(data, body, body_end), False, None
+        if box_type == b'mdat':
+            return None, True, None
+    return None, False, None
+
+
+def parse_mp4_tail(data: bytes) -> Optional[Dict[str, Any]]:
+    """
+    在文件尾部数据中定位完整的 moov box 并解析
+    """
+    index = data.rfind(b'moov')
+    while index >= 4:
+        size = struct.unpack('>I', data[index - 4:index])[0]
+        if 8 <= size <= len(data) - index + 4:
+            return _parse_mp4_moov(data, index + 4, index - 4 + size)
+        index = data.rfind(b'moov', 0, index)
+    return None
+
+
 class ANiStrmPro(_PluginBase):
     FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+    # 探测媒体信息时读取的文件头、文件尾字节数
+    PROBE_HEAD_BYTES = 512 * 1024
+    PROBE_TAIL_BYTES = 2 * 1024 * 1024
+    # moov 位于头部但超出 PROBE_HEAD_BYTES 时，最多补读到的字节数
+    PROBE_MOOV_BYTES = 16 * 1024 * 1024
+    # 探测结果缓存条数上限
+    PROBE_CACHE_SIZE = 5000
+    # 同一文件连续多少次未能写入 nfo（探测失败或 nfo 尚未刮削）后不再重试，也不再阻塞目录指纹
+    PROBE_MAX_ATTEMPTS = 3
+    # 任务优先级，数值越小越先执行
+    PRIORITY_FOLDER = 0
+    PRIORITY_RSS = 1
+    PRIORITY_SEASON = 2
+    PRIORITY_BACKFILL = 3
+    # 历史补库的续接任务排在所有补库任务之后，保证队列中只有一个季度的子目录
+    PRIORITY_HISTORY = 4
+    # 历史补库单个季度失败后的重试间隔（秒，按次数翻倍）和连续失败多少次后跳过该季度
+    HISTORY_RETRY_DELAY = 60
+    HISTORY_MAX_FAILURES = 3
     # 插件名称
     plugin_name = "ANiStrmPro"
     # 插件描述
@@ -55,7 +180,7 @@ class ANiStrmPro(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/shanhai2333/MoviePilot-Plugins/main/icons/anistrmpro.png"
     # 插件版本
-    plugin_version = "2.9.1"  # 版本号升级，表示融合了新功能
+    plugin_version = "2.9.6"  # 版本号升级，表示融合了新功能
     # 插件作者
     plugin_author = "honue, shanhai2333, fused_by_ai"
     # 作者主页
@@ -79,10 +204,33 @@ class ANiStrmPro(_PluginBase):
     _storageplace = None
     _filename_remove = ''
     _filename_blacklist = ''
+    # 额外存储目标，每行一个：存储路径|删除字符串|黑名单
+    _extra_targets = ''
+    _targets: List[Dict[str, Any]] = []
+    _skip_unchanged = True
+    # 生成媒体信息 nfo
+    _sidecar = False
+    _probe_workers = 4
+    # 按季度从旧到新补全全部历史季度
+    _history_backfill = False
+    _history_lock = threading.Lock()
+    # 本次运行中已为其排队子目录的历史季度，续接任务据此确认该季度已处理完
+    _history_season: Optional[str] = None
     _date = None  # 存储当前处理的日期字符串
 
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
+    # 任务队列：堆中为 (优先级, 序号, 任务键)，_pending_jobs 记录每个任务键当前有效的堆条目和参数
+    _job_heap: List[Tuple[int, int, Tuple[str, str]]] = []
+    _pending_jobs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    _job_cond: Optional[threading.Condition] = None
+    _job_seq = None
+    _running_job: Optional[Tuple[str, str]] = None
+    _worker: Optional[threading.Thread] = None
+    _worker_stop: Optional[threading.Event] = None
+    # 工作线程各自持有的停止事件，重新配置后旧线程只看到自己已置位的事件
+    _worker_local = threading.local()
+    _fingerprint_lock = threading.Lock()
 
     def _get_base_url(self) -> str:
         if self._image_url and self._image_url.strip():
@@ -97,6 +245,35 @@ class ANiStrmPro(_PluginBase):
     def _is_mirror_mode(self) -> bool:
         return bool(self._image_url and self._image_url.strip())
 
+    @staticmethod
+    def _split_rules(rules: Optional[str]) -> List[str]:
+        if not rules:
+            return []
+        return [item.strip() for item in rules.split('@') if item.strip()]
+
+    def _parse_targets(self) -> List[Dict[str, Any]]:
+        """
+        解析存储目标：主存储地址在前，额外目标每行一个，格式 存储路径|删除字符串|黑名单
+        """
+        targets: List[Dict[str, Any]] = []
+        if self._storageplace:
+            targets.append({
+                'storageplace': self._storageplace,
+                'remove': self._split_rules(self._filename_remove),
+                'blacklist': self._split_rules(self._filename_blacklist),
+            })
+        for line in (self._extra_targets or '').splitlines():
+            parts = [part.strip() for part in line.split('|')]
+            if not parts[0]:
+                continue
+            parts += [''] * (3 - len(parts))
+            targets.append({
+                'storageplace': parts[0],
+                'remove': self._split_rules(parts[1]),
+                'blacklist': self._split_rules(parts[2]),
+            })
+        return targets
+
     def init_plugin(self, config: dict = None):
         # 停止现有任务
         self.stop_service()
@@ -115,8 +292,21 @@ class ANiStrmPro(_PluginBase):
             self._storageplace = config.get("storageplace")
             self._filename_remove = config.get("filename_remove")
             self._filename_blacklist = config.get("filename_blacklist")
+            self._extra_targets = config.get("extra_targets") or ''
+            self._skip_unchanged = config.get("skip_unchanged", True)
+            self._sidecar = config.get("sidecar") or False
+            self._history_backfill = config.get("history_backfill") or False
+            try:
+                self._probe_workers = max(1, int(config.get("probe_workers") or 4))
+            except (TypeError, ValueError):
+                self._probe_workers = 4
+
+        self._targets = self._parse_targets()
+        self._migrate_folder_fingerprints()
 
         if self._enabled or self._onlyonce:
+            self.__start_worker()
+
             # 定时服务
             self._scheduler = BackgroundScheduler(timezone=settings.TZ)
 
@@ -140,6 +330,12 @@ class ANiStrmPro(_PluginBase):
 
             self.__update_config()
 
+            # 历史补库：开关打开时开始或继续，关闭时停止
+            if self._history_backfill:
+                self.__start_history()
+            elif self._load_history_progress().get('running'):
+                self.__stop_history()
+
             # 启动任务
             if self._scheduler.get_jobs():
                 self._scheduler.print_jobs()
@@ -229,9 +425,84 @@ class ANiStrmPro(_PluginBase):
         finally:
             rep.close()
 
-    def _collect_season_entries(self, folder_path: str, relative_dir: str = "") -> List[Dict[str, str]]:
+    @staticmethod
+    def _folder_fingerprint(file_info: Dict[str, Any]) -> Optional[str]:
+        """
+        由目录的 modifiedTime 与 size 生成指纹，两者均缺失时返回 None（不参与剪枝）
+        """
+        modified_time = file_info.get('modifiedTime') or ''
+        size = file_info.get('size')
+        if not modified_time and size is None:
+            return None
+        return f'{modified_time}|{size if size is not None else ""}'
+
+    def _fingerprint_scope(self) -> str:
+        """
+        指纹作用域：镜像地址或任一存储目标（含命名规则）变化后，旧指纹全部失效
+        """
+        targets = [f"{target['storageplace']}#{'@'.join(target['remove'])}#{'@'.join(target['blacklist'])}"
+                   for target in self._targets]
+        # 开启 nfo 生成后需要重新遍历一次，为已有 strm 补齐 nfo
+        sidecar = ['sidecar'] if self._sidecar else []
+        return '|'.join([self._get_base_url()] + targets + sidecar)
+
+    @staticmethod
+    def _fingerprint_key(season: str) -> str:
+        """
+        目录指纹按季度分开保存，处理一个目录只需读写所在季度的指纹
+        """
+        return f'folder_fingerprints:{season}'
+
+    def _load_folder_fingerprints(self, season: str) -> Dict[str, str]:
+        store = self.get_data(self._fingerprint_key(season)) or {}
+        if store.get('scope') != self._fingerprint_scope():
+            return {}
+        return store.get('folders') or {}
+
+    def _save_folder_fingerprints(self, folder_path: str, crawled: Dict[str, str]):
+        """
+        用本次成功爬取的结果替换该目录下的全部目录指纹
+        """
+        season = folder_path.split('/', 1)[0]
+        with self._fingerprint_lock:
+            folders = self._load_folder_fingerprints(season)
+            prefix = f"{folder_path.rstrip('/')}/"
+            folders = {path: fp for path, fp in folders.items() if not path.startswith(prefix)}
+            folders.update(crawled)
+            self.save_data(self._fingerprint_key(season), {
+                'scope': self._fingerprint_scope(),
+                'folders': folders,
+            })
+
+    def _migrate_folder_fingerprints(self):
+        """
+        把旧版保存在同一个键下的全部目录指纹拆分到各季度的键
+        """
+        store = self.get_data('folder_fingerprints')
+        if not store:
+            return
+        seasons: Dict[str, Dict[str, str]] = {}
+        for path, fingerprint in (store.get('folders') or {}).items():
+            seasons.setdefault(path.split('/', 1)[0], {})[path] = fingerprint
+        for season, folders in seasons.items():
+            self.save_data(self._fingerprint_key(season), {'scope': store.get('scope'), 'folders': folders})
+        self.del_data('folder_fingerprints')
+        logger.info(f'目录指纹已按季度拆分保存，共 {len(seasons)} 个季度')
+
+    def _collect_season_entries(self, folder_path: str, relative_dir: str = "",
+                                fingerprints: Dict[str, str] = None,
+                                crawled: Dict[str, str] = None,
+                                defer_folder: Callable[[str, str, Optional[str]], Any] = None
+                                ) -> List[Dict[str, str]]:
+        """
+        递归收集目录下的文件；传入 fingerprints 时跳过指纹未变化的子目录，
+        本次确认过的子目录指纹写入 crawled；传入 defer_folder 时不再深入子目录，而是交给它另行处理
+        """
         base_url = self._get_base_url()
         payload = self._fetch_folder_payload(f'{base_url}/{folder_path}')
+        if not isinstance(payload, dict):
+            # 多次重试仍失败
+            raise ValueError(f'目录请求失败：{unquote(folder_path)}')
         entries: List[Dict[str, str]] = []
 
         for file_info in payload.get('files', []):
@@ -243,7 +514,21 @@ class ANiStrmPro(_PluginBase):
             if mime_type == self.FOLDER_MIME_TYPE:
                 child_relative_dir = f'{relative_dir}/{name}'.strip('/')
                 child_folder_path = f"{folder_path.rstrip('/')}/{quote(name, safe='')}/"
-                entries.extend(self._collect_season_entries(child_folder_path, child_relative_dir))
+                fingerprint = self._folder_fingerprint(file_info)
+                if fingerprints and fingerprint and fingerprints.get(child_folder_path) == fingerprint:
+                    logger.debug(f'目录未变化，跳过：{child_relative_dir}')
+                    if crawled is not None:
+                        # 沿用被跳过子树内的旧指纹
+                        crawled.update({path: fp for path, fp in fingerprints.items()
+                                        if path.startswith(child_folder_path)})
+                    continue
+                if defer_folder:
+                    defer_folder(child_folder_path, child_relative_dir, fingerprint)
+                    continue
+                entries.extend(self._collect_season_entries(child_folder_path, child_relative_dir,
+                                                            fingerprints=fingerprints, crawled=crawled))
+                if crawled is not None and fingerprint:
+                    crawled[child_folder_path] = fingerprint
                 continue
 
             encoded_name = quote(name, safe='')
@@ -252,33 +537,15 @@ class ANiStrmPro(_PluginBase):
                 'name': name,
                 'url': file_url,
                 'relative_dir': relative_dir,
+                'size': file_info.get('size'),
             })
 
         return entries
 
-    def get_current_season_list(self) -> List:
-        base_url = self._get_base_url()
-        season = self.__get_ani_season()
-        logger.info(f"获取季度文件列表：{base_url}/{season}/")
-
-        try:
-            return self._collect_season_entries(f'{season}/')
-        except Exception as e:
-            logger.error(f"解析季度列表失败：{str(e)}")
-            return []
-
-    def get_season_entries(self, season: str) -> List[Dict[str, str]]:
-        base_url = self._get_base_url()
-        logger.info(f"获取季度文件列表：{base_url}/{season}/")
-
-        try:
-            return self._collect_season_entries(f'{season}/')
-        except Exception as e:
-            logger.error(f"解析季度列表失败：{str(e)}")
-            return []
-
     def get_available_seasons(self, use_cache: bool = True) -> List[str]:
         payload = self._fetch_folder_payload(f'{self._get_base_url()}/')
+        if not isinstance(payload, dict):
+            return []
         seasons = []
         for file_info in payload.get('files') or []:
             name = file_info.get('name') or ''
@@ -331,18 +598,13 @@ class ANiStrmPro(_PluginBase):
 
         return ret_array
 
-    def __remove_strings(self, file_name: str) -> str:
+    @staticmethod
+    def __remove_strings(file_name: str, remove_list: List[str]) -> str:
         """
         从文件名中删除配置的字符串
         """
-        if not self._filename_remove:
-            return file_name
-
-        remove_list = self._filename_remove.split('@')
         for remove_str in remove_list:
-            remove_str = remove_str.strip()
-            if remove_str:
-                file_name = file_name.replace(remove_str, '')
+            file_name = file_name.replace(remove_str, '')
 
         return file_name
 
@@ -350,11 +612,8 @@ class ANiStrmPro(_PluginBase):
         """检查 URL 是否已经是标准 mp4 直链格式"""
         return url.endswith('.mp4')
 
-    def _is_blacklisted(self, file_name: str) -> bool:
-        if not self._filename_blacklist:
-            return False
-
-        blacklist = [item.strip() for item in self._filename_blacklist.split('@') if item.strip()]
+    @staticmethod
+    def _is_blacklisted(file_name: str, blacklist: List[str]) -> bool:
         for keyword in blacklist:
             if keyword in file_name:
                 logger.info(f'文件命中黑名单，跳过生成：{file_name}，关键词：{keyword}')
@@ -379,15 +638,7 @@ class ANiStrmPro(_PluginBase):
 
         return url
 
-    def __touch_strm_file(self, file_name, file_url: str = None, relative_dir: str = None) -> bool:
-        src_url = ""
-
-        # 过滤字幕文件 (srt, vtt, ass 等)
-        if file_name.lower().endswith(('.srt', '.vtt', '.ass', '.ssa')):
-            return False
-        if self._is_blacklisted(file_name):
-            return False
-
+    def __build_src_url(self, file_name: str, file_url: str = None) -> str:
         if not file_url:
             # === 全量模式 (手动构建 URL) ===
             base_url = self._get_base_url()
@@ -401,70 +652,621 @@ class ANiStrmPro(_PluginBase):
 
             # 调试日志
             logger.debug(f"构建全量 URL: {src_url}")
-        else:
-            # === 增量模式 (RSS 链接) ===
-            if self._is_mirror_mode():
-                # 镜像模式下直接使用 RSS/XML 中的 link，避免改写后请求失败
-                src_url = file_url
-            else:
-                # 非镜像模式沿用标准化逻辑，统一成兼容的 mp4 直链格式
-                if self._is_url_format_valid(file_url):
-                    src_url = file_url
-                else:
-                    src_url = self._convert_url_format(file_url)
-                    if src_url != file_url:
-                        logger.debug(f"URL 格式已修正：{file_url} -> {src_url}")
+            return src_url
+
+        # === 增量模式 (RSS 链接) ===
+        if self._is_mirror_mode():
+            # 镜像模式下直接使用 RSS/XML 中的 link，避免改写后请求失败
+            return file_url
+
+        # 非镜像模式沿用标准化逻辑，统一成兼容的 mp4 直链格式
+        if self._is_url_format_valid(file_url):
+            return file_url
+        src_url = self._convert_url_format(file_url)
+        if src_url != file_url:
+            logger.debug(f"URL 格式已修正：{file_url} -> {src_url}")
+        return src_url
+
+    def __touch_strm_file(self, file_name, file_url: str = None, relative_dir: str = None,
+                          size: Any = None, sidecars: Dict[str, Dict[str, Any]] = None) -> int:
+        """
+        为每个存储目标生成 strm 文件，返回新创建的文件数；
+        传入 sidecars 时，把 nfo 缺少媒体信息（或尚未刮削出 nfo）的文件按链接归集到其中
+        """
+        # 过滤字幕文件 (srt, vtt, ass 等)
+        if file_name.lower().endswith(('.srt', '.vtt', '.ass', '.ssa')):
+            return 0
 
+        src_url = None
+        cnt = 0
+        for target in self._targets:
+            if self._is_blacklisted(file_name, target['blacklist']):
+                continue
+            # 同一文件的链接只构建一次，由所有存储目标共用
+            if src_url is None:
+                src_url = self.__build_src_url(file_name, file_url)
+            file_path = self.__strm_path(target, file_name, relative_dir)
+            if self.__write_strm_file(file_path, src_url):
+                cnt += 1
+            if sidecars is not None and file_path.exists():
+                nfo_path = file_path.with_suffix('.nfo')
+                if not self.__has_stream_details(nfo_path):
+                    job = sidecars.setdefault(src_url, {'size': size, 'paths': []})
+                    job['paths'].append(nfo_path)
+        return cnt
+
+    def __strm_path(self, target: Dict[str, Any], file_name: str, relative_dir: str = None) -> Path:
         # 处理文件名（用于本地 .strm 文件的命名）
         # 注意：本地文件名不需要 URL 编码，但需要清洗用户配置的字符串
-        clean_file_name = self.__remove_strings(file_name)
+        clean_file_name = self.__remove_strings(file_name, target['remove'])
 
-        directory = Path(self._storageplace)
+        directory = Path(target['storageplace'])
         if relative_dir:
             directory = directory / relative_dir
-        file_path = directory / f'{clean_file_name}.strm'
+        return directory / f'{clean_file_name}.strm'
 
+    @staticmethod
+    def __write_strm_file(file_path: Path, src_url: str) -> bool:
         if file_path.exists():
-            logger.debug(f'strm 文件已存在：{file_path.name}')
+            logger.debug(f'strm 文件已存在：{file_path}')
             return False
 
         try:
-            directory.mkdir(parents=True, exist_ok=True)
+            file_path.parent.mkdir(parents=True, exist_ok=True)
             file_path.write_text(src_url, encoding='utf-8')
-            logger.debug(f'创建 strm 文件成功：{file_path.name} -> {src_url[:50]}...')
+            logger.debug(f'创建 strm 文件成功：{file_path} -> {src_url[:50]}...')
             return True
         except Exception as e:
-            logger.error(f'创建 strm 源文件失败：{file_path.name} - {str(e)}, 链接：{src_url}')
+            logger.error(f'创建 strm 源文件失败：{file_path} - {str(e)}, 链接：{src_url}')
             return False
 
-    def __task(self, fulladd: bool = False):
+    @staticmethod
+    def __has_stream_details(nfo_path: Path) -> bool:
+        try:
+            return '<streamdetails>' in nfo_path.read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError):
+            return False
+
+    def __fetch_range(self, url: str, start: int, end: int) -> Tuple[Optional[bytes], Optional[int]]:
+        """
+        按 Range 读取远端文件的一段数据，返回 (数据, 文件总大小)；服务端不支持 Range 时也只读取所需长度
+        """
+        res = RequestUtils(
+            ua=settings.USER_AGENT if settings.USER_AGENT else None,
+            proxies=settings.PROXY if settings.PROXY else None,
+            headers={"Range": f"bytes={start}-{end}"}
+        ).get_res(url, stream=True)
+        if res is None or res.status_code not in (200, 206):
+            return None, None
+        try:
+            total = None
+            content_range = res.headers.get('Content-Range') or ''
+            if '/' in content_range and content_range.rsplit('/', 1)[1].isdigit():
+                total = int(content_range.rsplit('/', 1)[1])
+            limit = end - start + 1
+            chunks = []
+            received = 0
+            for chunk in res.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= limit:
+                    break
+            return b''.join(chunks)[:limit], total
+        finally:
+            res.close()
+
+    def __probe_media(self, url: str, size: Any = None) -> Optional[Dict[str, Any]]:
+        """
+        只读取文件头（moov 在尾部时再读取文件尾，超出头部时补读剩余部分）来获取媒体信息
+        """
+        try:
+            head, total = self.__fetch_range(url, 0, self.PROBE_HEAD_BYTES - 1)
+            if not head:
+                return None
+            info, moov_at_tail, moov_end = parse_mp4_head(head)
+            if info is None and moov_end and moov_end <= self.PROBE_MOOV_BYTES:
+                # moov 在头部但比读取的头部大，补读剩余部分
+                rest, _ = self.__fetch_range(url, len(head), moov_end - 1)
+                if rest:
+                    info, _, _ = parse_mp4_head(head + rest)
+            elif info is None and moov_at_tail:
+                total = total or (int(size) if str(size or '').isdigit() else None)
+                if not total:
+                    return None
+                tail, _ = self.__fetch_range(url, max(0, total - self.PROBE_TAIL_BYTES), total - 1)
+                info = parse_mp4_tail(tail) if tail else None
+            return info or None
+        except Exception as e:
+            logger.warn(f'探测媒体信息失败：{url} - {str(e)}')
+            return None
+
+    @staticmethod
+    def __build_nfo(info: Dict[str, Any], nfo_path: Path) -> Optional[str]:
+        """
+        把 streamdetails 插入到已有 nfo 的 fileinfo 或根节点内；nfo 不存在或无法解析时返回 None
+        """
+        video = info.get('video') or {}
+        audio = info.get('audio') or {}
+        lines = ['    <streamdetails>']
+        if video:
+            lines.append('      <video>')
+            for key, tag in (('codec', 'codec'), ('width', 'width'), ('height', 'height')):
+                if video.get(key):
+                    lines.append(f'        <{tag}>{video[key]}</{tag}>')
+            if info.get('duration'):
+                lines.append(f"        <durationinseconds>{info['duration']}</durationinseconds>")
+            lines.append('      </video>')
+        if audio:
+            lines.append('      <audio>')
+            for key in ('codec', 'channels'):
+                if audio.get(key):
+                    lines.append(f'        <{key}>{audio[key]}</{key}>')
+            lines.append('      </audio>')
+        lines.append('    </streamdetails>')
+        streamdetails = '\n'.join(lines)
+        fileinfo = f'  <fileinfo>\n{streamdetails}\n  </fileinfo>'
+
+        try:
+            content = nfo_path.read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError):
+            content = ''
+        # 已有 fileinfo（但没有 streamdetails）时补到其中，避免出现两个 fileinfo
+        fileinfo_end = content.find('</fileinfo>')
+        if fileinfo_end > 0:
+            return f'{content[:fileinfo_end].rstrip()}\n{streamdetails}\n  {content[fileinfo_end:]}'
+        if '<fileinfo/>' in content:
+            return content.replace('<fileinfo/>', fileinfo.lstrip(), 1)
+        root_end = content.rfind('</')
+        if root_end > 0:
+            return f'{content[:root_end].rstrip()}\n{fileinfo}\n{content[root_end:]}'
+        return None
+
+    def __generate_sidecars(self, sidecars: Dict[str, Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        并行探测缺少的媒体信息并写入 nfo，探测结果按链接缓存；
+        返回 (写入的 nfo 数, 下次需要重试的 nfo 数)，连续失败达到上限的文件不再重试
+        """
+        if not sidecars:
+            return 0, 0
+
+        cache: Dict[str, Dict[str, Any]] = self.get_data('probe_cache') or {}
+        attempts: Dict[str, int] = self.get_data('probe_attempts') or {}
+        # 只补全已刮削出的 nfo，nfo 都还不存在的文件留到下次再探测
+        pending = [url for url, job in sidecars.items()
+                   if url not in cache and attempts.get(url, 0) < self.PROBE_MAX_ATTEMPTS
+                   and any(nfo_path.exists() for nfo_path in job['paths'])]
+        if pending:
+            logger.info(f'开始探测 {len(pending)} 个文件的媒体信息，缓存命中 {len(sidecars) - len(pending)} 个')
+            with ThreadPoolExecutor(max_workers=self._probe_workers) as executor:
+                results = executor.map(lambda url: self.__probe_media(url, sidecars[url].get('size')), pending)
+                for url, info in zip(pending, results):
+                    if info:
+                        cache[url] = info
+            if len(cache) > self.PROBE_CACHE_SIZE:
+                cache = dict(list(cache.items())[-self.PROBE_CACHE_SIZE:])
+            self.save_data('probe_cache', cache)
+
         cnt = 0
+        retry = 0
+        attempts_changed = False
+        for url, job in sidecars.items():
+            info = cache.get(url)
+            written = 0
+            for nfo_path in job['paths'] if info else []:
+                try:
+                    content = self.__build_nfo(info, nfo_path)
+                    if content is None:
+                        continue
+                    nfo_path.write_text(content, encoding='utf-8')
+                    written += 1
+                except Exception as e:
+                    logger.error(f'写入 nfo 失败：{nfo_path} - {str(e)}')
+            cnt += written
+            if written == len(job['paths']):
+                attempts_changed |= attempts.pop(url, None) is not None
+                continue
+            # 记录失败次数，达到上限后不再计入重试，避免该文件所在目录每次都被重新遍历和探测
+            count = attempts.get(url, 0)
+            if count >= self.PROBE_MAX_ATTEMPTS:
+                continue
+            attempts[url] = count + 1
+            attempts_changed = True
+            if count + 1 < self.PROBE_MAX_ATTEMPTS:
+                retry += len(job['paths']) - written
+            else:
+                logger.warn(f'连续 {self.PROBE_MAX_ATTEMPTS} 次未能生成 nfo，不再重试：{url}')
+        if attempts_changed:
+            if len(attempts) > self.PROBE_CACHE_SIZE:
+                attempts = dict(list(attempts.items())[-self.PROBE_CACHE_SIZE:])
+            self.save_data('probe_attempts', attempts)
+        return cnt, retry
+
+    def __start_worker(self):
+        self._job_heap = []
+        self._pending_jobs = {}
+        self._job_cond = threading.Condition()
+        self._job_seq = itertools.count()
+        self._running_job = None
+        self._history_season = None
+        self._worker_stop = threading.Event()
+        # 队列和停止事件作为参数交给线程，旧线程即使晚于重新配置才退出，也不会接手新队列
+        self._worker = threading.Thread(target=self.__job_loop, name="ANiStrmPro-worker", daemon=True,
+                                        args=(self._worker_stop, self._job_cond, self._job_heap, self._pending_jobs))
+        self._worker.start()
+
+    def __stopped(self) -> bool:
+        """
+        当前线程所属的工作线程是否已停止；非工作线程按当前队列的停止事件判断
+        """
+        stop = getattr(self._worker_local, 'stop', None) or self._worker_stop
+        return bool(stop and stop.is_set())
+
+    def _enqueue_job(self, kind: str, arg: str = '', priority: int = None, **kwargs) -> bool:
+        """
+        加入任务队列；相同任务已在排队时不重复加入，新优先级更高时提升其优先级
+        """
+        cond = self._job_cond
+        if not cond:
+            return False
+        key = (kind, arg)
+        priority = self.PRIORITY_BACKFILL if priority is None else priority
+        with cond:
+            # 停止队列需要先拿到这把锁，锁内确认未停止后，读到的仍是该条件变量对应的队列；
+            # 已停止的旧工作线程不会向新队列添加任务
+            if self.__stopped():
+                return False
+            pending = self._pending_jobs.get(key)
+            if pending and pending['priority'] <= priority:
+                return False
+            seq = next(self._job_seq)
+            self._pending_jobs[key] = {'priority': priority, 'seq': seq,
+                                       'kwargs': kwargs or (pending or {}).get('kwargs') or {}}
+            heapq.heappush(self._job_heap, (priority, seq, key))
+            cond.notify()
+        return pending is None
+
+    def __next_job(self, stop: threading.Event, cond: threading.Condition,
+                   heap: List[Tuple[int, int, Tuple[str, str]]], pending_jobs: Dict[Tuple[str, str], Dict[str, Any]]
+                   ) -> Optional[Tuple[Tuple[str, str], Dict[str, Any]]]:
+        with cond:
+            while not stop.is_set():
+                while heap:
+                    priority, seq, key = heapq.heappop(heap)
+                    pending = pending_jobs.get(key)
+                    # 优先级被提升过的任务会留下过期的堆条目
+                    if not pending or pending['seq'] != seq:
+                        continue
+                    del pending_jobs[key]
+                    self._running_job = key
+                    return key, pending['kwargs']
+                cond.wait()
+        return None
+
+    def __job_loop(self, stop: threading.Event, cond: threading.Condition,
+                   heap: List[Tuple[int, int, Tuple[str, str]]], pending_jobs: Dict[Tuple[str, str], Dict[str, Any]]):
+        self._worker_local.stop = stop
+        while not stop.is_set():
+            job = self.__next_job(stop, cond, heap, pending_jobs)
+            if not job:
+                break
+            (kind, arg), kwargs = job
+            try:
+                if kind == 'rss':
+                    self.__run_rss_job()
+                elif kind == 'season':
+                    self.__run_season_job(arg)
+                elif kind == 'folder':
+                    self.__run_folder_job(arg, **kwargs)
+                elif kind == 'history':
+                    self.__run_history_job()
+            except Exception as e:
+                logger.error(f'ANi-Strm 任务执行失败：{kind} {arg} - {str(e)}')
+            finally:
+                if not stop.is_set():
+                    self._running_job = None
+
+    def __stop_worker(self):
+        if not self._worker_stop:
+            return
+        self._worker_stop.set()
+        with self._job_cond:
+            self._job_heap.clear()
+            self._pending_jobs.clear()
+            self._job_cond.notify_all()
+        # 不等待旧线程：正在执行的任务在当前步骤结束后自行退出，且只会看到自己的停止事件
+        self._worker = None
+
+    def __task(self, fulladd: bool = False):
+        """
+        定时任务与立即运行入口，只负责把任务放入队列
+        """
+        if not self._targets:
+            logger.warn('未配置任何 strm 存储目标，任务结束')
+            return
+
         if not fulladd:
-            # 增量模式
-            rss_info_list = self.get_latest_list()
-            logger.info(f'本次处理增量更新 {len(rss_info_list)} 个文件')
-            for rss_info in rss_info_list:
-                rss_link = rss_info.get('link')
-                if rss_link:
-                    if self.__touch_strm_file(file_name=rss_info['title'], file_url=rss_link):
-                        cnt += 1
-        else:
-            # 全量模式
-            seasons = self._get_target_seasons()
-            if not seasons:
-                logger.info('未选择任何季度，全量任务结束')
+            self._enqueue_job('rss', priority=self.PRIORITY_RSS)
+            return
+
+        seasons = self._get_target_seasons()
+        if not seasons:
+            logger.info('未选择任何季度，全量任务结束')
+            return
+        for season in seasons:
+            self._enqueue_job('season', season, priority=self.PRIORITY_SEASON)
+
+    def __run_rss_job(self):
+        # 增量模式
+        sidecars: Optional[Dict[str, Dict[str, Any]]] = {} if self._sidecar else None
+        cnt = 0
+        rss_info_list = self.get_latest_list()
+        logger.info(f'本次处理增量更新 {len(rss_info_list)} 个文件')
+        for rss_info in rss_info_list:
+            if self.__stopped():
                 return
+            rss_link = rss_info.get('link')
+            if rss_link:
+                cnt += self.__touch_strm_file(file_name=rss_info['title'], file_url=rss_link,
+                                              sidecars=sidecars)
+        nfo_cnt, _ = self.__generate_sidecars(sidecars)
+        self.__log_result(cnt, nfo_cnt)
+
+    def __run_season_job(self, season: str):
+        """
+        处理季度根目录下的文件，子目录拆分为补库任务排队，便于插队的任务在其间执行
+        """
+        if season == 'latest':
+            season = self.__get_ani_season()
+        logger.info(f"获取季度文件列表：{self._get_base_url()}/{season}/")
+
+        fingerprints = self._load_folder_fingerprints(season) if self._skip_unchanged else None
+        folders: List[Tuple[str, str, Optional[str]]] = []
+        file_entries = self._collect_season_entries(
+            f'{season}/', fingerprints=fingerprints,
+            defer_folder=lambda path, relative_dir, fingerprint: folders.append((path, relative_dir, fingerprint)))
+        logger.info(f'季度 {season} 根目录 {len(file_entries)} 个文件，待处理子目录 {len(folders)} 个')
+
+        self.__materialize(file_entries)
+        for path, relative_dir, fingerprint in folders:
+            self._enqueue_job('folder', path, priority=self.PRIORITY_BACKFILL,
+                              relative_dir=relative_dir, fingerprint=fingerprint)
+
+    def __run_folder_job(self, folder_path: str, relative_dir: str = None, fingerprint: str = None):
+        """
+        递归处理单个目录，成功后记录该目录及其子目录的指纹
+        """
+        if relative_dir is None:
+            # 去掉季度目录即为存储时的相对目录
+            relative_dir = '/'.join(unquote(part) for part in folder_path.strip('/').split('/')[1:])
+        fingerprints = self._load_folder_fingerprints(folder_path.split('/', 1)[0]) if self._skip_unchanged else None
+        # 手动刷新的目录没有新指纹，沿用旧指纹即可（本次已完整遍历）
+        fingerprint = fingerprint or (fingerprints or {}).get(folder_path)
+        crawled: Dict[str, str] = {}
+        file_entries = self._collect_season_entries(folder_path, relative_dir,
+                                                    fingerprints=fingerprints, crawled=crawled)
+        logger.info(f'处理目录 {unquote(folder_path)}，共 {len(file_entries)} 个文件')
+        # 被停止或有文件的媒体信息探测失败时不记录指纹，下次补库重新遍历该目录
+        if not self.__materialize(file_entries):
+            return
+        if fingerprint:
+            crawled[folder_path] = fingerprint
+        # 目录处理完成后才记录指纹，中途失败的目录下次会重新完整爬取
+        self._save_folder_fingerprints(folder_path, crawled)
+
+    def _load_history_progress(self) -> Dict[str, Any]:
+        return self.get_data('history_progress') or {'running': False, 'done': [], 'current': None}
+
+    def __start_history(self, reset: bool = False) -> bool:
+        """
+        开始或继续历史补库；reset 或上一轮已全部完成时清空已完成的季度，重新从最早的季度开始
+        （已完成的目录仍由目录指纹跳过）
+        """
+        if not self._job_cond or not self._targets:
+            return False
+        with self._history_lock:
+            progress = self._load_history_progress()
+            if reset or progress.get('finished'):
+                progress = {'running': False, 'done': [], 'current': None}
+            progress['running'] = True
+            progress.pop('finished', None)
+            self.save_data('history_progress', progress)
+        self._enqueue_job('history', priority=self.PRIORITY_HISTORY)
+        return True
+
+    def __stop_history(self):
+        """
+        停止历史补库：已排队的当季子目录照常完成，不再续接下一个季度
+        """
+        with self._history_lock:
+            progress = self._load_history_progress()
+            progress['running'] = False
+            self.save_data('history_progress', progress)
+        if self._job_cond:
+            with self._job_cond:
+                self._pending_jobs.pop(('history', ''), None)
+
+    def __run_history_job(self):
+        """
+        历史补库的一步：确认上一个季度已完成，再处理下一个季度的根目录并把其子目录排队，
+        最后排入续接任务。队列中同时只有一个季度的子目录，内存占用与季度总数无关
+        """
+        with self._history_lock:
+            progress = self._load_history_progress()
+            if not progress.get('running'):
+                return
+            current = progress.get('current')
+            # 续接任务排在该季度全部子目录之后，执行到这里说明该季度已处理完
+            if current and current == self._history_season:
+                if current not in progress['done']:
+                    progress['done'].append(current)
+                progress['current'] = None
+                progress.get('failures', {}).pop(current, None)
+                self.save_data('history_progress', progress)
+                logger.info(f'历史补库：季度 {current} 处理完成，已完成 {len(progress["done"])} 个季度')
+            self._history_season = None
+
+        try:
+            seasons = sorted(self.get_available_seasons(), key=lambda item: tuple(map(int, item.split('-'))))
+        except Exception as e:
+            logger.error(f'历史补库：获取季度列表出错 - {str(e)}')
+            seasons = []
+        if not seasons:
+            self.__history_failed(None, '获取季度列表失败')
+            return
+        done = set(progress['done']) | set(progress.get('skipped') or [])
+        # 重启后从中断的季度继续，已完成的子目录由目录指纹跳过
+        season = progress.get('current') or next((item for item in seasons if item not in done), None)
+
+        with self._history_lock:
+            progress = self._load_history_progress()
+            if not progress.get('running'):
+                return
+            if not season:
+                progress.update(running=False, current=None, finished=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                self.save_data('history_progress', progress)
+            else:
+                progress['current'] = season
+                self.save_data('history_progress', progress)
+        if not season:
+            logger.info(f'历史补库完成，共 {len(progress["done"])} 个季度')
+            self._history_backfill = False
+            self.__update_config()
+            return
+
+        logger.info(f'历史补库：开始处理季度 {season}，剩余 {len([item for item in seasons if item not in done])} 个季度')
+        try:
+            self.__run_season_job(season)
+        except Exception as e:
+            self.__history_failed(season, str(e))
+            return
+        if self.__stopped():
+            return
+        self._history_season = season
+        self._enqueue_job('history', priority=self.PRIORITY_HISTORY)
+
+    def __history_failed(self, season: Optional[str], error: str):
+        """
+        记录历史补库的失败并延迟重试；同一季度连续失败达到上限后跳过，继续后面的季度
+        """
+        if self.__stopped():
+            return
+        with self._history_lock:
+            progress = self._load_history_progress()
+            if not progress.get('running'):
+                return
+            failures = progress.setdefault('failures', {})
+            count = failures.get(season or '', 0) + 1
+            progress['last_error'] = {'season': season, 'error': error,
+                                      'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+            if season and count >= self.HISTORY_MAX_FAILURES:
+                failures.pop(season, None)
+                progress.setdefault('skipped', []).append(season)
+                progress['current'] = None
+                delay = 0
+                logger.error(f'历史补库：季度 {season} 连续 {count} 次失败，已跳过 - {error}')
+            else:
+                failures[season or ''] = count
+                delay = min(self.HISTORY_RETRY_DELAY * 2 ** (count - 1), 3600)
+                logger.warn(f'历史补库：{f"季度 {season}" if season else "季度列表"} 第 {count} 次失败，'
+                            f'{delay} 秒后重试 - {error}')
+            self.save_data('history_progress', progress)
+
+        if not delay or not self._scheduler:
+            self._enqueue_job('history', priority=self.PRIORITY_HISTORY)
+            return
+        self._scheduler.add_job(func=self._enqueue_job, args=['history'],
+                                kwargs={'priority': self.PRIORITY_HISTORY}, trigger='date',
+                                run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(seconds=delay),
+                                name="ANiStrm 历史补库重试")
+        if not self._scheduler.running:
+            self._scheduler.start()
+
+    def __materialize(self, file_entries: List[Dict[str, Any]]) -> bool:
+        """
+        为一批文件生成 strm（及 nfo），被停止或有 nfo 需要重试时返回 False
+        """
+        sidecars: Optional[Dict[str, Dict[str, Any]]] = {} if self._sidecar else None
+        cnt = 0
+        for file_entry in file_entries:
+            if self.__stopped():
+                return False
+            cnt += self.__touch_strm_file(file_name=file_entry['name'],
+                                          file_url=file_entry.get('url'),
+                                          relative_dir=file_entry.get('relative_dir'),
+                                          size=file_entry.get('size'),
+                                          sidecars=sidecars)
+        nfo_cnt, retry = self.__generate_sidecars(sidecars)
+        self.__log_result(cnt, nfo_cnt)
+        if retry > 0:
+            logger.warn(f'{retry} 个 nfo 未能生成，下次补库时重新探测')
+            return False
+        return True
 
-            for season in seasons:
-                file_entries = self.get_season_entries(season)
-                logger.info(f'本次处理季度 {season} 全量列表 {len(file_entries)} 个文件')
-                for file_entry in file_entries:
-                    if self.__touch_strm_file(file_name=file_entry['name'],
-                                              file_url=file_entry.get('url'),
-                                              relative_dir=file_entry.get('relative_dir')):
-                        cnt += 1
+    def __log_result(self, cnt: int, nfo_cnt: int):
+        if cnt or nfo_cnt:
+            logger.info(f'任务完成，新创建了 {cnt} 个 strm 文件' + (f'，写入 {nfo_cnt} 个 nfo' if self._sidecar else ''))
 
-        logger.info(f'任务完成，新创建了 {cnt} 个 strm 文件')
+    @staticmethod
+    def __normalize_folder_path(path: str) -> str:
+        """
+        将 季度/番剧名 形式的目录转换为与遍历时一致的编码路径
+        """
+        parts = [part for part in unquote(path or '').replace('\\', '/').split('/') if part]
+        return ''.join(f"{quote(part, safe='')}/" for part in parts)
+
+    def __api_response(self, queued: bool, job: str) -> schemas.Response:
+        if queued:
+            return schemas.Response(success=True, message=f'{job} 已加入队列')
+        return schemas.Response(success=True, message=f'{job} 已在队列中')
+
+    def api_sync_season(self, season: str = 'latest') -> schemas.Response:
+        if not self._job_cond or not self._targets:
+            return schemas.Response(success=False, message='插件未启用或未配置存储目标')
+        return self.__api_response(self._enqueue_job('season', season, priority=self.PRIORITY_SEASON),
+                                   f'季度 {season}')
+
+    def api_sync_folder(self, path: str) -> schemas.Response:
+        if not self._job_cond or not self._targets:
+            return schemas.Response(success=False, message='插件未启用或未配置存储目标')
+        folder_path = self.__normalize_folder_path(path)
+        if folder_path.count('/') < 2:
+            return schemas.Response(success=False, message='目录格式应为 季度/番剧名，例如 2024-1/葬送的芙莉莲')
+        # 手动刷新时不沿用该目录自身的指纹，强制重新遍历
+        return self.__api_response(self._enqueue_job('folder', folder_path, priority=self.PRIORITY_FOLDER),
+                                   f'目录 {unquote(folder_path)}')
+
+    def api_sync_rss(self) -> schemas.Response:
+        if not self._job_cond or not self._targets:
+            return schemas.Response(success=False, message='插件未启用或未配置存储目标')
+        return self.__api_response(self._enqueue_job('rss', priority=self.PRIORITY_RSS), 'RSS 增量更新')
+
+    def api_history_start(self, reset: bool = False) -> schemas.Response:
+        if not self.__start_history(reset=reset):
+            return schemas.Response(success=False, message='插件未启用或未配置存储目标')
+        self._history_backfill = True
+        self.__update_config()
+        return schemas.Response(success=True, message='历史补库已重新开始' if reset else '历史补库已开始，未完成时从上次进度继续')
+
+    def api_history_stop(self) -> schemas.Response:
+        self.__stop_history()
+        self._history_backfill = False
+        self.__update_config()
+        return schemas.Response(success=True, message='历史补库已停止，当前季度已排队的目录会继续完成')
+
+    def api_history(self) -> schemas.Response:
+        return schemas.Response(success=True, data=self._load_history_progress())
+
+    def api_jobs(self) -> schemas.Response:
+        if not self._job_cond:
+            return schemas.Response(success=True, data={'running': None, 'pending': []})
+        with self._job_cond:
+            pending = sorted(self._pending_jobs.items(), key=lambda item: (item[1]['priority'], item[1]['seq']))
+            running = self._running_job
+        return schemas.Response(success=True, data={
+            'running': {'kind': running[0], 'arg': unquote(running[1])} if running else None,
+            'pending': [{'kind': kind, 'arg': unquote(arg), 'priority': job['priority']}
+                        for (kind, arg), job in pending],
+        })
 
     def get_state(self) -> bool:
         return self._enabled
@@ -474,7 +1276,64 @@ class ANiStrmPro(_PluginBase):
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/sync_season",
+                "endpoint": self.api_sync_season,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "同步季度",
+                "description": "将指定季度（默认最新季）的补库任务加入队列",
+            },
+            {
+                "path": "/sync_folder",
+                "endpoint": self.api_sync_folder,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "同步目录",
+                "description": "立即刷新指定目录（季度/番剧名），优先于补库任务执行",
+            },
+            {
+                "path": "/sync_rss",
+                "endpoint": self.api_sync_rss,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "RSS 增量更新",
+                "description": "将一次 RSS 增量更新加入队列",
+            },
+            {
+                "path": "/history/start",
+                "endpoint": self.api_history_start,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "开始历史补库",
+                "description": "按季度从旧到新补全全部历史季度，默认从上次进度继续，reset=true 时重新开始",
+            },
+            {
+                "path": "/history/stop",
+                "endpoint": self.api_history_stop,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "停止历史补库",
+                "description": "停止历史补库，进度保留，可随时继续",
+            },
+            {
+                "path": "/history",
+                "endpoint": self.api_history,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "历史补库进度",
+                "description": "查看已完成的季度和当前处理中的季度",
+            },
+            {
+                "path": "/jobs",
+                "endpoint": self.api_jobs,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "任务队列",
+                "description": "查看正在执行和排队中的任务",
+            },
+        ]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         season_options = self.__build_season_options()
@@ -487,21 +1346,29 @@ class ANiStrmPro(_PluginBase):
                         'content': [
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12, 'md': 4},
+                                'props': {'cols': 12, 'md': 3},
                                 'content': [
                                     {'component': 'VSwitch', 'props': {'model': 'enabled', 'label': '启用插件'}}]
                             },
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12, 'md': 4},
+                                'props': {'cols': 12, 'md': 3},
                                 'content': [
                                     {'component': 'VSwitch', 'props': {'model': 'onlyonce', 'label': '立即运行一次'}}]
                             },
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12, 'md': 4},
+                                'props': {'cols': 12, 'md': 3},
                                 'content': [
                                     {'component': 'VSwitch', 'props': {'model': 'fulladd', 'label': '按所选季度补库'}}]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {'component': 'VSwitch', 'props': {'model': 'skip_unchanged', 'label': '补库跳过未变更目录',
+                                                                       'hint': '根据目录修改时间和大小判断，未变化的番剧目录不再重复遍历',
+                                                                       'persistent-hint': True}}]
                             }
                         ]
                     },
@@ -510,7 +1377,7 @@ class ANiStrmPro(_PluginBase):
                         'content': [
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12, 'md': 4},
+                                'props': {'cols': 12, 'md': 3},
                                 'content': [{'component': 'VTextField', 'props': {'model': 'cron', 'label': '执行周期',
                                                                                   'placeholder': '*/20 22,23,0,1 * * *'}}]
                             },
@@ -547,6 +1414,50 @@ class ANiStrmPro(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12},
+                                'content': [{'component': 'VTextarea',
+                                             'props': {'model': 'extra_targets', 'label': '额外存储目标',
+                                                       'rows': 3,
+                                                       'placeholder': '/downloads/strm_jellyfin|ABC@DEF|预告@PV',
+                                                       'hint': '每行一个：存储路径|文件名删除字符串|文件名黑名单，后两项可省略；'
+                                                               '所有目标共用同一次目录遍历和 RSS 请求',
+                                                       'persistent-hint': True}}]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {'component': 'VSwitch', 'props': {'model': 'sidecar', 'label': '生成媒体信息 nfo',
+                                                                       'hint': '读取文件头获取时长、分辨率和编码补充到已刮削的 nfo 中，媒体服务器扫库时无需再访问远端',
+                                                                       'persistent-hint': True}}]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [{'component': 'VTextField',
+                                             'props': {'model': 'probe_workers', 'label': '媒体信息探测并发数',
+                                                       'type': 'number', 'placeholder': '4'}}]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {'component': 'VSwitch', 'props': {'model': 'history_backfill', 'label': '补全全部历史季度',
+                                                                       'hint': '按季度从旧到新逐个补库，进度会保存，关闭后再打开从中断处继续，全部完成后自动关闭',
+                                                                       'persistent-hint': True}}]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -578,7 +1489,7 @@ class ANiStrmPro(_PluginBase):
                                         'props': {
                                             'type': 'info',
                                             'variant': 'tonal',
-                                            'text': '功能说明：\n1. 自动从 ANi 抓取直链生成 strm 文件。\n2. 支持镜像配置，镜像地址留空则使用默认官方地址。\n3. 支持文件名清洗（删除特定字符串）。\n4. 支持按所选季度递归补库，自动保留子目录结构。',
+                                            'text': '功能说明：\n1. 自动从 ANi 抓取直链生成 strm 文件。\n2. 支持镜像配置，镜像地址留空则使用默认官方地址。\n3. 支持文件名清洗（删除特定字符串）。\n4. 支持按所选季度递归补库，自动保留子目录结构。\n5. 补库时记录各目录的修改时间与大小，未变更的目录自动跳过。\n6. 支持多个存储目标，各自配置命名与黑名单规则，共用一次遍历。\n7. 可选生成包含时长、分辨率、编码的 nfo，探测结果会缓存。\n8. 提供 API 将季度、单个目录或 RSS 更新加入任务队列，单目录刷新优先执行。\n9. 可补全镜像上的全部历史季度，逐季处理并保存进度，可停止后继续。',
                                             'style': 'white-space: pre-line;'
                                         }
                                     },
@@ -601,11 +1512,16 @@ class ANiStrmPro(_PluginBase):
             "enabled": False,
             "onlyonce": False,
             "fulladd": False,
+            "skip_unchanged": True,
             "storageplace": '/downloads/strm',
             "selected_seasons": ["latest"],
             "cron": "*/20 22,23,0,1 * * *",
             "filename_remove": "",
             "filename_blacklist": "",
+            "extra_targets": "",
+            "sidecar": False,
+            "probe_workers": 4,
+            "history_backfill": False,
             "image_url": "",
             "image_rss_url": ""
         }
@@ -625,12 +1541,17 @@ class ANiStrmPro(_PluginBase):
             "cron": self._cron,
             "enabled": self._enabled,
             "fulladd": self._fulladd,
+            "skip_unchanged": self._skip_unchanged,
             "storageplace": self._storageplace,
             "selected_seasons": self._selected_seasons,
             "image_url": self._image_url,
             "image_rss_url": self._image_rss_url,
             "filename_remove": self._filename_remove,
             "filename_blacklist": self._filename_blacklist,
+            "extra_targets": self._extra_targets,
+            "sidecar": self._sidecar,
+            "probe_workers": self._probe_workers,
+            "history_backfill": self._history_backfill,
         })
 
     def get_page(self) -> List[dict]:
@@ -638,6 +1559,7 @@ class ANiStrmPro(_PluginBase):
 
     def stop_service(self):
         try:
+            self.__stop_worker()
             if self._scheduler:
                 self._scheduler.remove_all_jobs()
                 if self._scheduler.running:
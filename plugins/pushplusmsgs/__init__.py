@@ -1,10 +1,218 @@
-from typing import Any, List, Dict, Tuple
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, List, Dict, Tuple, Optional
 
+import requests
+from requests.adapters import HTTPAdapter
+
+from app import schemas
 from app.core.event import eventmanager, Event
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas.types import EventType, NotificationType
-from app.utils.http import RequestUtils
+
+
+class QuotaLimiter:
+    """
+    单个 PushPlus 令牌的限流器：令牌桶控制每分钟发送速率，另按自然日统计已用额度
+    """
+
+    SEND = "send"
+    DEFER = "defer"
+    SHED = "shed"
+
+    def __init__(self, rate_per_minute: int, daily_limit: int, day: str, used: int = 0):
+        self.rate_per_minute = rate_per_minute
+        self.daily_limit = daily_limit
+        self.day = day
+        self.used = used
+        self._tokens = float(rate_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now().strftime("%Y-%m-%d")
+
+    @staticmethod
+    def seconds_to_tomorrow() -> float:
+        now = datetime.now()
+        tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return (tomorrow - now).total_seconds()
+
+    def used_today(self) -> int:
+        return self.used if self.day == self.today() else 0
+
+    def remaining(self) -> Optional[int]:
+        """
+        今日剩余额度，未设置每日额度时返回 None
+        """
+        if not self.daily_limit:
+            return None
+        return max(0, self.daily_limit - self.used_today())
+
+    def acquire(self, floor: int, shed: bool = False) -> Tuple[str, float]:
+        """
+        申请一次发送：剩余额度不高于 floor 时推迟到次日（shed 时直接放弃），
+        速率超限时返回需要等待的秒数
+        """
+        with self._lock:
+            today = self.today()
+            if self.day != today:
+                self.day, self.used = today, 0
+            if self.daily_limit and self.daily_limit - self.used <= floor:
+                return (self.SHED, 0) if shed else (self.DEFER, self.seconds_to_tomorrow())
+            if self.rate_per_minute:
+                now = time.monotonic()
+                self._tokens = min(float(self.rate_per_minute),
+                                   self._tokens + (now - self._updated) * self.rate_per_minute / 60)
+                self._updated = now
+                if self._tokens < 1:
+                    return self.DEFER, (1 - self._tokens) * 60 / self.rate_per_minute
+                self._tokens -= 1
+            self.used += 1
+            return self.SEND, 0
+
+
+class DedupeCache:
+    """
+    重复消息抑制缓存：记录窗口期内发送过的消息摘要，超出容量时淘汰最早的记录
+    """
+
+    def __init__(self, window: int, max_size: int):
+        self.window = window
+        self.max_size = max_size
+        self.hits = 0
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(*parts: Any) -> str:
+        return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def seen(self, key: str) -> bool:
+        """
+        窗口期内出现过返回 True，否则记录并返回 False
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._entries:
+                oldest_key, oldest_time = next(iter(self._entries.items()))
+                if now - oldest_time < self.window:
+                    break
+                self._entries.popitem(last=False)
+            if key in self._entries:
+                self.hits += 1
+                return True
+            self._entries[key] = now
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DeliveryMetrics:
+    """
+    发送统计：按 (消息类型, 目标) 统计各类计数，并记录排队到送达的延迟与接口耗时分布
+    """
+
+    # 排队到送达延迟的分桶上限（秒）
+    LATENCY_BUCKETS = (0.1, 0.5, 1, 5, 15, 60, 300, 1800, 3600, 21600)
+    # 单次接口请求耗时的分桶上限（秒）
+    REQUEST_BUCKETS = (0.2, 0.5, 1, 2, 5, 10)
+    COUNTERS = ("received", "delivered", "retried", "failed", "dropped", "suppressed", "deferred")
+
+    def __init__(self):
+        self.started = time.time()
+        self.max_queue_depth = 0
+        self._counters: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._latency: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._request: Dict[str, Dict[str, Any]] = {}
+        self._codes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def __new_histogram(buckets: Tuple[float, ...]) -> Dict[str, Any]:
+        return {"counts": [0] * (len(buckets) + 1), "sum": 0.0, "max": 0.0}
+
+    @staticmethod
+    def __observe(histogram: Dict[str, Any], buckets: Tuple[float, ...], value: float):
+        index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+        histogram["counts"][index] += 1
+        histogram["sum"] += value
+        histogram["max"] = max(histogram["max"], value)
+
+    @staticmethod
+    def __summary(histogram: Dict[str, Any], buckets: Tuple[float, ...]) -> Dict[str, Any]:
+        """
+        由分桶估算平均值与 P50/P95（取所在分桶的上限，不超过最大值）
+        """
+        total = sum(histogram["counts"])
+        summary = {"count": total, "avg": round(histogram["sum"] / total, 3) if total else None,
+                   "max": round(histogram["max"], 3), "buckets": dict(zip([str(b) for b in buckets] + ["+Inf"],
+                                                                          histogram["counts"]))}
+        for name, ratio in (("p50", 0.5), ("p95", 0.95)):
+            summary[name] = None
+            cumulative = 0
+            for bound, count in zip(list(buckets) + [histogram["max"]], histogram["counts"]):
+                cumulative += count
+                if total and cumulative >= total * ratio:
+                    summary[name] = round(min(bound, histogram["max"]), 3)
+                    break
+        return summary
+
+    def incr(self, counter: str, msg_type: str, destination: str = "-", value: int = 1):
+        with self._lock:
+            counters = self._counters.setdefault((msg_type, destination), dict.fromkeys(self.COUNTERS, 0))
+            counters[counter] += value
+
+    def observe_delivery(self, msg_type: str, destination: str, latency: float):
+        with self._lock:
+            counters = self._counters.setdefault((msg_type, destination), dict.fromkeys(self.COUNTERS, 0))
+            counters["delivered"] += 1
+            histogram = self._latency.setdefault((msg_type, destination),
+                                                 self.__new_histogram(self.LATENCY_BUCKETS))
+            self.__observe(histogram, self.LATENCY_BUCKETS, latency)
+
+    def observe_request(self, destination: str, code: str, duration: float):
+        with self._lock:
+            self._codes[code] = self._codes.get(code, 0) + 1
+            histogram = self._request.setdefault(destination, self.__new_histogram(self.REQUEST_BUCKETS))
+            self.__observe(histogram, self.REQUEST_BUCKETS, duration)
+
+    def observe_queue(self, depth: int):
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = []
+            for (msg_type, destination), counters in sorted(self._counters.items()):
+                latency = self._latency.get((msg_type, destination))
+                rows.append({
+                    "type": msg_type,
+                    "destination": destination,
+                    **counters,
+                    "latency": self.__summary(latency, self.LATENCY_BUCKETS) if latency else None,
+                })
+            return {
+                "since": datetime.fromtimestamp(self.started).strftime("%Y-%m-%d %H:%M:%S"),
+                "max_queue_depth": self.max_queue_depth,
+                "totals": {name: sum(row[name] for row in rows) for name in self.COUNTERS},
+                "rows": rows,
+                "requests": {destination: self.__summary(histogram, self.REQUEST_BUCKETS)
+                             for destination, histogram in sorted(self._request.items())},
+                "codes": dict(sorted(self._codes.items())),
+            }
 
 
 class PushPlusMsgs(_PluginBase):
@@ -15,7 +223,7 @@ class PushPlusMsgs(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/shanhai2333/MoviePilot-Plugins/main/icons/Pushplusplugin.png"
     # 插件版本
-    plugin_version = "1.1"
+    plugin_version = "1.9"
     # 插件作者
     plugin_author = "cheng,shanhai2333"
     # 作者主页
@@ -27,20 +235,289 @@ class PushPlusMsgs(_PluginBase):
     # 可使用的用户级别
     auth_level = 1
 
+    # PushPlus 发送接口
+    SEND_URL = "http://www.pushplus.plus/send"
+    # 队列满时的处理策略
+    OVERFLOW_DROP_OLDEST = "drop_oldest"
+    OVERFLOW_DROP_NEW = "drop_new"
+    OVERFLOW_BLOCK = "block"
+    # 阻塞策略下最长等待时间（秒）
+    BLOCK_TIMEOUT = 1
+    # 退出时等待队列发送完毕的最长时间（秒）
+    DRAIN_TIMEOUT = 10
+    # 发送线程空闲时检查退出信号的间隔（秒）
+    WORKER_POLL = 1
+    # 汇总消息中单条正文的最大长度
+    DIGEST_TEXT_LIMIT = 500
+    # 请求超时（秒）
+    REQUEST_TIMEOUT = 10
+    # 发送失败后的重试：最多次数、首次间隔与最大间隔（秒），间隔按指数增长
+    MAX_ATTEMPTS = 10
+    RETRY_BASE = 30
+    RETRY_MAX = 3600
+    # 检查待重试消息的间隔（秒）
+    RETRY_POLL = 5
+    # 一条消息发往多个目标时的并发数
+    FANOUT_WORKERS = 8
+    # 重复消息缓存的最大条数
+    DEDUPE_CACHE_SIZE = 2000
+    # 令牌池成员返回这些错误码或错误原因时，当天不再使用（额度用尽、令牌无效、账号受限、未实名）
+    EJECT_CODES = (900, 903, 905)
+    EJECT_KEYWORDS = ("上限", "次数")
+    # 令牌池选择策略
+    POOL_WEIGHTED = "weighted"
+    POOL_LEAST_USED = "least_used"
+    # 消息优先级
+    PRIORITY_LOW = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_HIGH = 2
+
     # 私有属性
     _enabled = False
     _istopic = False
     _topicid = None
     _token = None
     _msgtypes = []
+    _queue_size = 100
+    _workers_num = 2
+    _overflow = OVERFLOW_DROP_OLDEST
+    # 合并窗口（秒），0 表示不合并
+    _coalesce_window = 0
+    _coalesce_max = 20
+    # 每个令牌每分钟最多发送条数（0 为不限）、每日额度与为重要消息预留的额度
+    _rate_limit = 0
+    _daily_limit = 200
+    _quota_reserve = 20
+    _high_types: List[str] = []
+    _low_types: List[str] = []
+    _low_shed = True
+    # 相同消息的抑制窗口（秒），0 为不抑制
+    _dedupe_window = 0
+    # 按消息类型路由：每行 消息类型: 目标1, 目标2
+    _routes_text = ''
+    _routes: Dict[str, List[Dict[str, Optional[str]]]] = {}
+    # 令牌池：每行 令牌|群组编码|权重，与插件令牌一起轮流承担默认目标的发送
+    _token_pool_text = ''
+    _pool_strategy = POOL_WEIGHTED
+    _pool: List[Dict[str, Any]] = []
+    _pool_lock = threading.Lock()
+    # 被暂停使用的令牌池成员及暂停当天的日期
+    _ejected: Dict[str, str] = {}
+
+    # 发送队列与工作线程
+    _queue: Optional[queue.Queue] = None
+    _workers: List[threading.Thread] = []
+    # 发送线程的退出信号：置位后线程发完队列中的消息即退出
+    _worker_stop: Optional[threading.Event] = None
+    # 退出时仍在发送中的旧发送线程，结束前其发件箱记录保持发送中状态
+    _late_workers: List[threading.Thread] = []
+    # 按消息类型暂存待合并的消息：{类型: {"deadline": 到期时间, "messages": [...]}}
+    _buffers: Dict[str, Dict[str, Any]] = {}
+    _buffer_cond: Optional[threading.Condition] = None
+    _flusher: Optional[threading.Thread] = None
+    # 持久化发件箱：未发送成功的消息保存在 sqlite 中，重启后继续发送
+    _outbox: Optional[sqlite3.Connection] = None
+    _outbox_lock = threading.Lock()
+    # 已放入发送队列、尚未处理完的发件箱消息 id
+    _inflight: set = set()
+    _retry_stop: Optional[threading.Event] = None
+    _retrier: Optional[threading.Thread] = None
+    _session: Optional[requests.Session] = None
+    _fanout: Optional[ThreadPoolExecutor] = None
+    _dedupe: Optional[DedupeCache] = None
+    _metrics: Optional[DeliveryMetrics] = None
+    # 各令牌的限流器
+    _limiters: Dict[str, QuotaLimiter] = {}
 
     def init_plugin(self, config: dict = None):
+        # 停止现有发送线程
+        self.stop_service()
+
         if config:
             self._enabled = config.get("enabled")
             self._istopic = config.get("istopic")
             self._topicid = config.get("topicid")
             self._token = config.get("token")
             self._msgtypes = config.get("msgtypes") or []
+            self._queue_size = self.__to_int(config.get("queue_size"), 100)
+            self._workers_num = self.__to_int(config.get("workers"), 2)
+            self._overflow = config.get("overflow") or self.OVERFLOW_DROP_OLDEST
+            self._coalesce_window = self.__to_int(config.get("coalesce_window"), 0, minimum=0)
+            self._coalesce_max = self.__to_int(config.get("coalesce_max"), 20)
+            self._rate_limit = self.__to_int(config.get("rate_limit"), 0, minimum=0)
+            self._daily_limit = self.__to_int(config.get("daily_limit"), 200, minimum=0)
+            self._quota_reserve = self.__to_int(config.get("quota_reserve"), 20, minimum=0)
+            self._high_types = config.get("high_types") or []
+            self._low_types = config.get("low_types") or []
+            self._low_shed = config.get("low_policy", "shed") != "defer"
+            self._routes_text = config.get("routes") or ''
+            self._token_pool_text = config.get("token_pool") or ''
+            self._pool_strategy = config.get("pool_strategy") or self.POOL_WEIGHTED
+            self._dedupe_window = self.__to_int(config.get("dedupe_window"), 0, minimum=0)
+
+        self._pool = self.__parse_pool(self._token_pool_text)
+        self._ejected = {}
+        self._routes = self.__parse_routes(self._routes_text)
+        self._dedupe = DedupeCache(self._dedupe_window, self.DEDUPE_CACHE_SIZE) if self._dedupe_window else None
+
+        self._limiters = {}
+        if not self._metrics:
+            self._metrics = DeliveryMetrics()
+        if self.get_state():
+            self.__open_outbox()
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._workers_num + self.FANOUT_WORKERS)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+            self._fanout = ThreadPoolExecutor(max_workers=self.FANOUT_WORKERS, thread_name_prefix="PushPlusMsgs-fanout")
+            self._queue = queue.Queue(maxsize=self._queue_size)
+            self._worker_stop = threading.Event()
+            self._workers = []
+            for i in range(self._workers_num):
+                worker = threading.Thread(target=self.__worker_loop, args=(self._queue, self._worker_stop),
+                                          name=f"PushPlusMsgs-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            if self._coalesce_window:
+                self._buffers = {}
+                self._buffer_cond = threading.Condition()
+                self._flusher = threading.Thread(target=self.__flush_loop, args=(self._buffer_cond,),
+                                                 name="PushPlusMsgs-coalesce", daemon=True)
+                self._flusher.start()
+            self._retry_stop = threading.Event()
+            self._retrier = threading.Thread(target=self.__retry_loop, args=(self._retry_stop,),
+                                             name="PushPlusMsgs-retry", daemon=True)
+            self._retrier.start()
+
+    def __parse_routes(self, text: str) -> Dict[str, List[Dict[str, Optional[str]]]]:
+        """
+        解析路由表，每行 消息类型: 目标1, 目标2；消息类型可写枚举名或中文名，* 表示其余类型。
+        目标格式：topic:群组编码、topic:群组编码@令牌、token:令牌、me（插件令牌一对一推送）、pool（令牌池）
+        """
+        type_names = {item.value: item.name for item in NotificationType}
+        routes: Dict[str, List[Dict[str, Optional[str]]]] = {}
+        for line in (text or '').splitlines():
+            if ':' not in line and '：' not in line:
+                continue
+            msg_type, targets = line.replace('：', ':', 1).split(':', 1)
+            msg_type = msg_type.strip()
+            msg_type = type_names.get(msg_type, msg_type)
+            destinations = []
+            for target in targets.split(','):
+                target = target.strip()
+                if target == 'me':
+                    destinations.append({"token": self._token, "topic": None})
+                elif target == 'pool' and self._pool:
+                    destinations.append({"pool": True})
+                elif target.startswith('topic:') and target[6:].strip():
+                    topic, _, token = target[6:].partition('@')
+                    destinations.append({"token": token.strip() or self._token, "topic": topic.strip()})
+                elif target.startswith('token:') and target[6:].strip():
+                    destinations.append({"token": target[6:].strip(), "topic": None})
+                elif target:
+                    logger.warn(f"PushPlus路由目标格式错误，已忽略：{target}")
+            if destinations:
+                routes.setdefault(msg_type, []).extend(destinations)
+        return routes
+
+    def __route(self, msg_type: Optional[NotificationType]) -> List[Dict[str, Optional[str]]]:
+        """
+        消息类型对应的发送目标，未配置路由时沿用群发开关的设置（配置了令牌池时由令牌池发送）
+        """
+        destinations = self._routes.get(msg_type.name if msg_type else '') or self._routes.get('*')
+        if destinations:
+            return destinations
+        if self._pool:
+            return [{"pool": True}]
+        if self._istopic and self._topicid:
+            return [{"token": self._token, "topic": self._topicid}]
+        return [{"token": self._token, "topic": None}]
+
+    @staticmethod
+    def __type_name(msg_type: Optional[NotificationType]) -> str:
+        return msg_type.value if msg_type else "未分类"
+
+    @staticmethod
+    def __destination_name(destination: Dict[str, Optional[str]]) -> str:
+        if destination.get("pool"):
+            return "令牌池"
+        token = f"{(destination.get('token') or '')[:4]}****"
+        return f"{token}/{destination['topic']}" if destination.get("topic") else token
+
+    def __parse_pool(self, text: str) -> List[Dict[str, Any]]:
+        """
+        解析令牌池，每行 令牌|群组编码|权重，后两项可省略；插件令牌（及群发群组）作为第一个成员
+        """
+        if not (text or '').strip():
+            return []
+        members = [{"token": self._token, "topic": self._topicid if self._istopic and self._topicid else None,
+                    "weight": 1}]
+        for line in text.splitlines():
+            parts = [part.strip() for part in line.split('|')]
+            if not parts[0]:
+                continue
+            parts += [''] * (3 - len(parts))
+            members.append({"token": parts[0], "topic": parts[1] or None,
+                            "weight": self.__to_int(parts[2], 1)})
+        for member in members:
+            member["key"] = f"{member['token']}/{member['topic'] or ''}"
+            member["current"] = 0
+        return list({member["key"]: member for member in reversed(members)}.values())[::-1]
+
+    def __pool_candidates(self) -> List[Dict[str, Any]]:
+        """
+        按策略排列今天可用的令牌池成员，排在前面的优先使用
+        """
+        today = QuotaLimiter.today()
+        with self._pool_lock:
+            active = [member for member in self._pool if self._ejected.get(member["key"]) != today]
+            if not active:
+                return []
+            if self._pool_strategy == self.POOL_LEAST_USED:
+                def usage(member: Dict[str, Any]) -> float:
+                    limiter = self.__limiter(member["token"])
+                    if limiter.daily_limit:
+                        return limiter.used_today() / limiter.daily_limit
+                    return limiter.used_today()
+
+                return sorted(active, key=usage)
+            # 平滑加权轮询
+            total = sum(member["weight"] for member in active)
+            for member in active:
+                member["current"] += member["weight"]
+            chosen = max(active, key=lambda member: member["current"])
+            chosen["current"] -= total
+            return [chosen] + sorted((member for member in active if member is not chosen),
+                                     key=lambda member: member["current"], reverse=True)
+
+    def __acquire_pool(self, priority: int) -> Tuple[str, float, Optional[Dict[str, Any]]]:
+        """
+        依次尝试令牌池成员，返回第一个可以发送的成员；都不可用时返回最短的等待时间
+        """
+        wait_min: Optional[float] = None
+        for member in self.__pool_candidates():
+            action, wait = self.__acquire(member["token"], priority)
+            if action == QuotaLimiter.SEND:
+                return action, 0, member
+            if action == QuotaLimiter.DEFER:
+                wait_min = wait if wait_min is None else min(wait_min, wait)
+        if wait_min is not None:
+            return QuotaLimiter.DEFER, wait_min, None
+        if priority == self.PRIORITY_LOW and self._low_shed:
+            return QuotaLimiter.SHED, 0, None
+        return QuotaLimiter.DEFER, QuotaLimiter.seconds_to_tomorrow(), None
+
+    def __eject(self, member: Dict[str, Any], error: str):
+        with self._pool_lock:
+            self._ejected[member["key"]] = QuotaLimiter.today()
+        logger.warn(f"PushPlus令牌池成员 {self.__destination_name(member)} 今日暂停使用，{error}")
+
+    @staticmethod
+    def __to_int(value: Any, default: int, minimum: int = 1) -> int:
+        try:
+            return max(minimum, int(value))
+        except (TypeError, ValueError):
+            return default
 
     def get_state(self) -> bool:
         return self._enabled and (True if self._token else False)
@@ -50,7 +527,94 @@ class PushPlusMsgs(_PluginBase):
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/budget",
+                "endpoint": self.api_budget,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "剩余额度",
+                "description": "查询各令牌今日已用与剩余的发送额度",
+            },
+            {
+                "path": "/metrics",
+                "endpoint": self.api_metrics,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "发送统计",
+                "description": "按消息类型和目标统计发送、重试、丢弃次数，排队到送达延迟及接口耗时",
+            }
+        ]
+
+    def api_metrics(self) -> schemas.Response:
+        return schemas.Response(success=True, data=self.__metrics())
+
+    def __metrics(self) -> Dict[str, Any]:
+        metrics = self._metrics.snapshot() if self._metrics else {}
+        message_queue = self._queue
+        metrics["queue_depth"] = message_queue.qsize() if message_queue else 0
+        metrics["outbox_pending"] = self.__outbox_count()
+        metrics["budget"] = self.__budget()
+        return metrics
+
+    def api_budget(self) -> schemas.Response:
+        return schemas.Response(success=True, data=self.__budget())
+
+    def __budget(self) -> List[Dict[str, Any]]:
+        budget = []
+        for token in self.__tokens():
+            limiter = self.__limiter(token)
+            budget.append({
+                "token": f"{token[:4]}****",
+                "daily_limit": limiter.daily_limit,
+                "used": limiter.used_today(),
+                "remaining": limiter.remaining(),
+                "rate_per_minute": limiter.rate_per_minute or None,
+            })
+        return budget
+
+    def __tokens(self) -> List[str]:
+        tokens = [self._token] if self._token else []
+        tokens += [member["token"] for member in self._pool]
+        for destinations in self._routes.values():
+            tokens += [destination["token"] for destination in destinations if destination.get("token")]
+        return list(dict.fromkeys(tokens))
+
+    def __limiter(self, token: str) -> QuotaLimiter:
+        limiter = self._limiters.get(token)
+        if limiter:
+            return limiter
+        day, used = QuotaLimiter.today(), 0
+        with self._outbox_lock:
+            if self._outbox:
+                row = self._outbox.execute("SELECT used FROM quota WHERE token = ? AND day = ?",
+                                           (token, day)).fetchone()
+                used = row[0] if row else 0
+        limiter = QuotaLimiter(rate_per_minute=self._rate_limit, daily_limit=self._daily_limit, day=day, used=used)
+        return self._limiters.setdefault(token, limiter)
+
+    def __priority(self, msg_type: Optional[NotificationType]) -> int:
+        if msg_type and msg_type.name in self._high_types:
+            return self.PRIORITY_HIGH
+        if msg_type and msg_type.name in self._low_types:
+            return self.PRIORITY_LOW
+        return self.PRIORITY_NORMAL
+
+    def __acquire(self, token: str, priority: int) -> Tuple[str, float]:
+        """
+        重要消息可用完全部额度，普通消息保留预留额度，低优先级消息保留两倍预留额度
+        """
+        limiter = self.__limiter(token)
+        floor = {self.PRIORITY_HIGH: 0,
+                 self.PRIORITY_NORMAL: self._quota_reserve,
+                 self.PRIORITY_LOW: self._quota_reserve * 2}[priority]
+        action, wait = limiter.acquire(floor=floor, shed=priority == self.PRIORITY_LOW and self._low_shed)
+        if action == QuotaLimiter.SEND:
+            with self._outbox_lock:
+                if self._outbox:
+                    self._outbox.execute("INSERT OR REPLACE INTO quota (token, day, used) VALUES (?, ?, ?)",
+                                         (token, limiter.day, limiter.used))
+        return action, wait
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -151,6 +715,75 @@ class PushPlusMsgs(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'routes',
+                                            'label': '按消息类型路由',
+                                            'rows': 3,
+                                            'placeholder': '资源下载: topic:群组编码1, topic:群组编码2\n整理入库: me, token:其他令牌\n*: topic:群组编码3@其他令牌',
+                                            'hint': '每行一条，类型可写中文名或枚举名，* 表示其余类型；目标支持 topic:群组编码、topic:群组编码@令牌、token:令牌、me、pool（令牌池）。未配置的类型沿用上方群发设置（配置了令牌池时由令牌池发送），多个目标并发发送',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 8
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'token_pool',
+                                            'label': '令牌池',
+                                            'rows': 3,
+                                            'placeholder': '令牌2|群组编码|2\n令牌3',
+                                            'hint': '每行一个：令牌|群组编码|权重，后两项可省略；与上方令牌一起分担发送，返回额度用尽或令牌无效的成员当天不再使用',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'pool_strategy',
+                                            'label': '令牌池选择策略',
+                                            'items': [
+                                                {'title': '按权重轮询', 'value': self.POOL_WEIGHTED},
+                                                {'title': '优先使用用量最少的', 'value': self.POOL_LEAST_USED},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -174,6 +807,263 @@ class PushPlusMsgs(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'queue_size',
+                                            'label': '发送队列长度',
+                                            'type': 'number',
+                                            'placeholder': '100',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'workers',
+                                            'label': '发送线程数',
+                                            'type': 'number',
+                                            'placeholder': '2',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'overflow',
+                                            'label': '队列满时',
+                                            'items': [
+                                                {'title': '挤出最早的消息', 'value': self.OVERFLOW_DROP_OLDEST},
+                                                {'title': '挤出新消息', 'value': self.OVERFLOW_DROP_NEW},
+                                                {'title': f'等待（最多{self.BLOCK_TIMEOUT}秒）', 'value': self.OVERFLOW_BLOCK},
+                                            ],
+                                            'hint': '被挤出的消息暂存到发件箱稍后发送，发件箱不可用时才丢弃',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'coalesce_window',
+                                            'label': '合并窗口（秒）',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                            'hint': '窗口内同类型消息合并为一条汇总发送，0 为不合并',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'coalesce_max',
+                                            'label': '单次汇总最多条数',
+                                            'type': 'number',
+                                            'placeholder': '20',
+                                            'hint': '达到条数后立即发送，不等窗口结束',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'dedupe_window',
+                                            'label': '重复消息抑制（秒）',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                            'hint': '时间内同一目标收到的相同消息只发送一次，0 为不抑制',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'rate_limit',
+                                            'label': '每分钟最多发送',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                            'hint': '每个令牌的发送速率，0 为不限',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'daily_limit',
+                                            'label': '每日额度',
+                                            'type': 'number',
+                                            'placeholder': '200',
+                                            'hint': '每个令牌每天可发送的条数，0 为不限',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'quota_reserve',
+                                            'label': '重要消息预留额度',
+                                            'type': 'number',
+                                            'placeholder': '20',
+                                            'hint': '剩余额度低于此值时只发送重要消息',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'multiple': True,
+                                            'chips': True,
+                                            'model': 'high_types',
+                                            'label': '重要消息类型',
+                                            'items': MsgTypeOptions
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'multiple': True,
+                                            'chips': True,
+                                            'model': 'low_types',
+                                            'label': '低优先级消息类型',
+                                            'items': MsgTypeOptions
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'low_policy',
+                                            'label': '低优先级消息额度不足时',
+                                            'items': [
+                                                {'title': '直接丢弃', 'value': 'shed'},
+                                                {'title': '推迟到次日', 'value': 'defer'},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -202,11 +1092,192 @@ class PushPlusMsgs(_PluginBase):
             "istopic": False,
             "topicid": '',
             'token': '',
-            'msgtypes': []
+            'msgtypes': [],
+            'routes': '',
+            'token_pool': '',
+            'pool_strategy': self.POOL_WEIGHTED,
+            'queue_size': 100,
+            'workers': 2,
+            'overflow': self.OVERFLOW_DROP_OLDEST,
+            'coalesce_window': 0,
+            'coalesce_max': 20,
+            'dedupe_window': 0,
+            'rate_limit': 0,
+            'daily_limit': 200,
+            'quota_reserve': 20,
+            'high_types': [],
+            'low_types': [],
+            'low_policy': 'shed'
         }
 
     def get_page(self) -> List[dict]:
-        pass
+        """
+        发送统计面板
+        """
+        metrics = self.__metrics()
+        totals = metrics.get("totals") or {}
+
+        def seconds(value: Optional[float]) -> str:
+            if value is None:
+                return "-"
+            return f"{value:.2f}s" if value < 60 else f"{value / 60:.1f}min"
+
+        def stat_card(title: str, value: Any) -> dict:
+            return {
+                'component': 'VCol',
+                'props': {
+                    'cols': 6,
+                    'md': 3
+                },
+                'content': [
+                    {
+                        'component': 'VCard',
+                        'props': {
+                            'variant': 'tonal'
+                        },
+                        'content': [
+                            {
+                                'component': 'VCardText',
+                                'content': [
+                                    {
+                                        'component': 'div',
+                                        'props': {
+                                            'class': 'text-caption'
+                                        },
+                                        'text': title
+                                    },
+                                    {
+                                        'component': 'div',
+                                        'props': {
+                                            'class': 'text-h6'
+                                        },
+                                        'text': str(value)
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+
+        def table(headers: List[str], rows: List[List[Any]]) -> dict:
+            return {
+                'component': 'VTable',
+                'props': {
+                    'hover': True,
+                    'density': 'compact'
+                },
+                'content': [
+                    {
+                        'component': 'thead',
+                        'content': [
+                            {
+                                'component': 'tr',
+                                'content': [{'component': 'th', 'text': header} for header in headers]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'tbody',
+                        'content': [
+                            {
+                                'component': 'tr',
+                                'content': [{'component': 'td', 'text': str(cell)} for cell in row]
+                            } for row in rows
+                        ]
+                    }
+                ]
+            }
+
+        delivery_rows = []
+        for row in metrics.get("rows") or []:
+            latency = row.get("latency") or {}
+            delivery_rows.append([row["type"], row["destination"], row["received"], row["delivered"],
+                                  row["retried"], row["failed"], row["dropped"], row["suppressed"],
+                                  row["deferred"], seconds(latency.get("avg")), seconds(latency.get("p95"))])
+        request_rows = [[destination, summary["count"], seconds(summary["avg"]), seconds(summary["p95"]),
+                         seconds(summary["max"])]
+                        for destination, summary in (metrics.get("requests") or {}).items()]
+        budget_rows = [[item["token"], item["used"],
+                        item["remaining"] if item["remaining"] is not None else "不限",
+                        item["rate_per_minute"] or "不限"]
+                       for item in metrics.get("budget") or []]
+        code_text = "，".join(f"{code}: {count}" for code, count in (metrics.get("codes") or {}).items()) or "暂无"
+
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    stat_card('已送达', totals.get("delivered", 0)),
+                    stat_card('重试', totals.get("retried", 0)),
+                    stat_card('放弃 / 丢弃', f'{totals.get("failed", 0)} / {totals.get("dropped", 0)}'),
+                    stat_card('重复抑制', totals.get("suppressed", 0)),
+                    stat_card('当前队列', metrics.get("queue_depth", 0)),
+                    stat_card('队列峰值', metrics.get("max_queue_depth", 0)),
+                    stat_card('发件箱待发', metrics.get("outbox_pending", 0)),
+                    stat_card('推迟发送', totals.get("deferred", 0)),
+                ]
+            },
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12
+                        },
+                        'content': [
+                            {
+                                'component': 'VAlert',
+                                'props': {
+                                    'type': 'info',
+                                    'variant': 'tonal',
+                                    'text': f'统计开始于 {metrics.get("since", "-")}。延迟为消息产生到送达的时间，'
+                                            f'接口耗时为单次请求 PushPlus 的时间；前者远大于后者时瓶颈在本地排队、合并或限流。'
+                                            f'\n接口返回码：{code_text}',
+                                    'style': 'white-space: pre-line;'
+                                }
+                            }
+                        ]
+                    }
+                ]
+            },
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12
+                        },
+                        'content': [
+                            table(['消息类型', '目标', '产生', '送达', '重试', '放弃', '丢弃', '重复', '推迟',
+                                   '平均延迟', 'P95延迟'], delivery_rows)
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 7
+                        },
+                        'content': [
+                            table(['目标', '请求数', '平均接口耗时', 'P95接口耗时', '最大接口耗时'], request_rows)
+                        ]
+                    },
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                            'md': 5
+                        },
+                        'content': [
+                            table(['令牌', '今日已用', '今日剩余', '每分钟上限'], budget_rows)
+                        ]
+                    }
+                ]
+            }
+        ]
 
     @eventmanager.register(EventType.NoticeMessage)
     def send(self, event: Event):
@@ -240,43 +1311,513 @@ class PushPlusMsgs(_PluginBase):
             logger.info(f"消息类型 {msg_type.value} 未开启消息发送")
             return
 
+        message = {
+            "type": msg_type,
+            "title": title,
+            "text": text,
+            "created": time.time()
+        }
+        self._metrics.incr("received", self.__type_name(msg_type))
+        if self._buffer_cond:
+            self.__coalesce(message)
+        else:
+            self.__enqueue(message)
+
+    def __coalesce(self, message: Dict[str, Any]):
+        """
+        同类型消息在合并窗口内暂存，窗口到期或达到条数上限时合并为一条
+        """
+        cond = self._buffer_cond
+        if not cond:
+            self.__enqueue(message)
+            return
+        key = message["type"].name if message.get("type") else ""
+        with cond:
+            if self._buffer_cond is not cond:
+                # 合并已停止（插件正在退出），直接入队
+                messages = [message]
+            else:
+                buffer = self._buffers.get(key)
+                if not buffer:
+                    buffer = {"deadline": time.time() + self._coalesce_window, "messages": []}
+                    self._buffers[key] = buffer
+                    cond.notify()
+                buffer["messages"].append(message)
+                if len(buffer["messages"]) < self._coalesce_max:
+                    return
+                messages = self._buffers.pop(key)["messages"]
+        self.__enqueue(self.__merge(messages))
+
+    def __merge(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        合并为一条汇总消息
+        """
+        if len(messages) == 1:
+            return messages[0]
+        msg_type: Optional[NotificationType] = messages[0].get("type")
+        lines = []
+        for index, message in enumerate(messages, start=1):
+            text = message.get("text") or ""
+            if len(text) > self.DIGEST_TEXT_LIMIT:
+                text = f"{text[:self.DIGEST_TEXT_LIMIT]}..."
+            lines.append("\n".join(item for item in (f"{index}. {message.get('title') or ''}".rstrip(), text) if item))
+        return {
+            "type": msg_type,
+            "title": f"{msg_type.value if msg_type else '消息'}汇总（{len(messages)}条）",
+            "text": "\n\n".join(lines),
+            "created": min(message.get("created") or time.time() for message in messages)
+        }
+
+    def __flush_loop(self, cond: threading.Condition):
+        """
+        到期的合并窗口放入发送队列
+        """
+        while True:
+            with cond:
+                if self._buffer_cond is not cond:
+                    return
+                now = time.time()
+                due = [key for key, buffer in self._buffers.items() if buffer["deadline"] <= now]
+                expired = [self._buffers.pop(key)["messages"] for key in due]
+                if not expired:
+                    deadlines = [buffer["deadline"] for buffer in self._buffers.values()]
+                    cond.wait(timeout=min(deadlines) - now if deadlines else None)
+                    continue
+            for messages in expired:
+                self.__enqueue(self.__merge(messages))
+
+    def __flush_all(self):
+        """
+        停止合并并立即放出全部暂存的消息
+        """
+        cond = self._buffer_cond
+        if not cond:
+            return
+        with cond:
+            self._buffer_cond = None
+            buffers, self._buffers = self._buffers, {}
+            cond.notify_all()
+        if self._flusher:
+            self._flusher.join(timeout=self.DRAIN_TIMEOUT)
+            self._flusher = None
+        for buffer in buffers.values():
+            self.__enqueue(self.__merge(buffer["messages"]))
+
+    def __enqueue(self, message: Dict[str, Any]):
+        """
+        放入发送队列，不在事件处理线程中等待网络请求；
+        已在发件箱中的消息被挤出队列时不会丢失，稍后由重试线程重新放入
+        """
+        message_queue = self._queue
+        if not message_queue:
+            self.__release(message)
+            return
+        if self._overflow == self.OVERFLOW_BLOCK:
+            try:
+                message_queue.put(message, timeout=self.BLOCK_TIMEOUT)
+                self._metrics.observe_queue(message_queue.qsize())
+            except queue.Full:
+                self.__drop(message)
+            return
+        while True:
+            try:
+                message_queue.put_nowait(message)
+                self._metrics.observe_queue(message_queue.qsize())
+                return
+            except queue.Full:
+                if self._overflow == self.OVERFLOW_DROP_NEW:
+                    self.__drop(message)
+                    return
+                try:
+                    dropped = message_queue.get_nowait()
+                    message_queue.task_done()
+                    self.__drop(dropped, oldest=True)
+                except queue.Empty:
+                    pass
+
+    def __drop(self, message: Dict[str, Any], oldest: bool = False):
+        if message.get("id"):
+            self.__release(message)
+            return
+        if self.__spill(message):
+            self._metrics.incr("deferred", self.__type_name(message.get("type")))
+            logger.info(f"PushPlus发送队列已满，{'最早的' if oldest else ''}消息暂存到发件箱稍后发送：{message.get('title')}")
+            return
+        self._metrics.incr("dropped", self.__type_name(message.get("type")))
+        logger.warn(f"PushPlus发送队列已满，丢弃{'最早的' if oldest else ''}消息：{message.get('title')}")
+
+    def __spill(self, message: Dict[str, Any]) -> bool:
+        """
+        按路由拆分为各目标的记录写入发件箱，由重试线程稍后放回队列；发件箱不可用时返回 False
+        """
+        if not self._outbox:
+            return False
+        destinations = [message["destination"]] if message.get("destination") \
+            else self.__route(message.get("type"))
+        for destination in destinations:
+            item = dict(message, destination=destination)
+            if self.__is_duplicate(item):
+                continue
+            self.__outbox_add(item)
+            self.__release(item)
+        return True
+
+    def __release(self, message: Dict[str, Any]):
+        """
+        发件箱消息离开发送流程，允许重试线程再次放入队列
+        """
+        if message.get("id"):
+            with self._outbox_lock:
+                self._inflight.discard(message["id"])
+
+    def __worker_loop(self, message_queue: queue.Queue, stop_event: threading.Event):
+        while True:
+            try:
+                message = message_queue.get(timeout=self.WORKER_POLL)
+            except queue.Empty:
+                # 退出信号独立于队列，清空队列时不会被一起取走
+                if stop_event.is_set():
+                    return
+                continue
+            try:
+                self.__process(message)
+            except Exception as err:
+                logger.error(f"PushPlus消息处理异常，{str(err)}")
+            finally:
+                message_queue.task_done()
+
+    def __process(self, message: Dict[str, Any]):
+        """
+        按路由拆分为各目标的消息，多个目标时并发发送
+        """
+        if message.get("id") and not message.get("destination"):
+            # 未拆分就保存的旧发件箱记录：删除原记录，按当前路由重新拆分
+            self.__outbox_delete(message)
+            self.__release(message)
+            message = {key: value for key, value in message.items() if key not in ("id", "attempts")}
+        if message.get("destination"):
+            # 发件箱中的消息已拆分到单个目标
+            self.__process_destination(message)
+            return
+        destinations = self.__route(message.get("type"))
+        if len(destinations) == 1 or not self._fanout:
+            for destination in destinations:
+                self.__process_destination(dict(message, destination=destination))
+            return
+        futures = [self._fanout.submit(self.__process_destination, dict(message, destination=destination))
+                   for destination in destinations]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as err:
+                logger.error(f"PushPlus消息处理异常，{str(err)}")
+
+    def __process_destination(self, message: Dict[str, Any]):
+        """
+        先写入发件箱再发送，成功后删除，失败按指数退避安排重试
+        """
+        if not message.get("id"):
+            if self.__is_duplicate(message):
+                return
+            self.__outbox_add(message)
+        msg_type = self.__type_name(message.get("type"))
+        destination = message["destination"]
         try:
-            sc_url = "http://www.pushplus.plus/send"
-            if self._istopic and self._topicid:
-                event_info = {
-                    "token": self._token,
-                    "title": title,
-                    "topic" : self._topicid,
-                    "content": text,
-                    "template": "txt",
-                    "channel": "wechat"
-                }
+            priority = self.__priority(message.get("type"))
+            if destination.get("pool"):
+                action, wait, target = self.__acquire_pool(priority)
             else:
-                event_info = {
-                    "token": self._token,
-                    "title": title,
-                    "content": text,
-                    "template": "txt",
-                    "channel": "wechat"
-                }
-            res = RequestUtils(content_type="application/json").post_res(sc_url, json=event_info)
-            if res and res.status_code == 200:
-                ret_json = res.json()
-                code = ret_json.get('code')
-                msg = ret_json.get('msg')
-                if code == 200:
-                    logger.info("PushPlus消息发送成功")
+                target = destination
+                action, wait = self.__acquire(target["token"], priority)
+            destination_name = self.__destination_name(target or destination)
+            if action == QuotaLimiter.SHED:
+                logger.warn(f"PushPlus今日剩余额度不足，放弃低优先级消息：{message.get('title')}")
+                self._metrics.incr("dropped", msg_type, destination_name)
+                self.__outbox_delete(message)
+                return
+            if action == QuotaLimiter.DEFER:
+                logger.info(f"PushPlus发送受限，消息推迟 {int(wait)} 秒：{message.get('title')}")
+                self._metrics.incr("deferred", msg_type, destination_name)
+                self.__outbox_retry(message, message.get("attempts", 0), time.time() + wait, "限流")
+                return
+            error, code = self.__deliver(message, target)
+            if not error:
+                self._metrics.observe_delivery(msg_type, destination_name,
+                                               time.time() - (message.get("created") or time.time()))
+                self.__outbox_delete(message)
+                return
+            if destination.get("pool") and (code in self.EJECT_CODES
+                                            or any(keyword in error for keyword in self.EJECT_KEYWORDS)):
+                # 换用令牌池中的其他成员立即重发，不计入重试次数
+                self.__eject(target, error)
+                self.__outbox_retry(message, message.get("attempts", 0), time.time(), error)
+                return
+            attempts = message.get("attempts", 0) + 1
+            if attempts >= self.MAX_ATTEMPTS:
+                logger.error(f"PushPlus消息已重试 {attempts} 次仍失败，放弃发送：{message.get('title')}，{error}")
+                self._metrics.incr("failed", msg_type, destination_name)
+                self.__outbox_delete(message)
+                return
+            delay = min(self.RETRY_BASE * 2 ** (attempts - 1), self.RETRY_MAX)
+            logger.info(f"PushPlus消息将在 {delay} 秒后第 {attempts} 次重试：{message.get('title')}")
+            self._metrics.incr("retried", msg_type, destination_name)
+            self.__outbox_retry(message, attempts, time.time() + delay, error)
+        finally:
+            self.__release(message)
+
+    def __is_duplicate(self, message: Dict[str, Any]) -> bool:
+        """
+        同一目标在抑制窗口内已收到过相同类型、标题和内容的消息
+        """
+        dedupe = self._dedupe
+        if dedupe is None:
+            return False
+        msg_type: Optional[NotificationType] = message.get("type")
+        destination = message["destination"]
+        key = dedupe.digest(msg_type.name if msg_type else None, message.get("title"), message.get("text"),
+                            destination.get("token"), destination.get("topic"))
+        if dedupe.seen(key):
+            self._metrics.incr("suppressed", self.__type_name(msg_type), self.__destination_name(destination))
+            logger.info(f"PushPlus重复消息已忽略（累计 {dedupe.hits} 条）：{message.get('title')}")
+            return True
+        return False
+
+    def __deliver(self, message: Dict[str, Any], destination: Dict[str, Any]) -> Tuple[Optional[str], Any]:
+        """
+        调用 PushPlus 接口发送消息，返回 (错误原因, 返回码)，成功时错误原因为 None
+        """
+        destination_name = self.__destination_name(destination)
+        if destination.get("topic"):
+            event_info = {
+                "token": destination["token"],
+                "title": message.get("title"),
+                "topic" : destination["topic"],
+                "content": message.get("text"),
+                "template": "txt",
+                "channel": "wechat"
+            }
+        else:
+            event_info = {
+                "token": destination["token"],
+                "title": message.get("title"),
+                "content": message.get("text"),
+                "template": "txt",
+                "channel": "wechat"
+            }
+        started = time.monotonic()
+        code = "error"
+        try:
+            res = self._session.post(self.SEND_URL, json=event_info, timeout=self.REQUEST_TIMEOUT)
+            try:
+                if res.status_code == 200:
+                    ret_json = res.json()
+                    code = ret_json.get('code')
+                    msg = ret_json.get('msg')
+                    if code == 200:
+                        logger.info(f"PushPlus消息发送成功：{destination_name}")
+                        return None, code
+                    error = f"接口返回失败，错误码：{code}，错误原因：{msg}"
                 else:
-                    logger.warn(f"PushPlus消息发送，接口返回失败，错误码：{code}，错误原因：{msg}")
-            elif res is not None:
-                logger.warn(f"PushPlus消息发送失败，错误码：{res.status_code}，错误原因：{res.reason}")
-            else:
-                logger.warn("PushPlus消息发送失败，未获取到返回信息")
+                    code = f"HTTP {res.status_code}"
+                    error = f"错误码：{res.status_code}，错误原因：{res.reason}"
+            finally:
+                res.close()
+        except requests.Timeout:
+            code = "timeout"
+            error = f"请求超时（{self.REQUEST_TIMEOUT}秒）"
         except Exception as msg_e:
-            logger.error(f"PushPlus消息发送异常，{str(msg_e)}")
+            error = f"请求异常：{str(msg_e)}"
+        finally:
+            self._metrics.observe_request(destination_name, str(code), time.monotonic() - started)
+        logger.warn(f"PushPlus消息发送失败：{destination_name}，{error}")
+        return error, code
+
+    def __open_outbox(self):
+        db_path = self.get_data_path() / "outbox.db"
+        self._outbox = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._outbox.execute("PRAGMA journal_mode=WAL")
+        self._outbox.execute("PRAGMA synchronous=NORMAL")
+        self._outbox.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_at REAL NOT NULL,
+                last_error TEXT
+            )
+        """)
+        columns = [row[1] for row in self._outbox.execute("PRAGMA table_info(outbox)")]
+        if "priority" not in columns:
+            self._outbox.execute("ALTER TABLE outbox ADD COLUMN priority INTEGER NOT NULL DEFAULT 1")
+        self._outbox.execute("""
+            CREATE TABLE IF NOT EXISTS quota (
+                token TEXT NOT NULL,
+                day TEXT NOT NULL,
+                used INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (token, day)
+            )
+        """)
+        self._outbox.execute("DELETE FROM quota WHERE day < ?", (QuotaLimiter.today(),))
+        # 旧发送线程仍在发送时保留发送中的记录，避免重试线程把同一条消息再发一次
+        if not any(worker.is_alive() for worker in self._late_workers):
+            self._inflight = set()
+
+    @staticmethod
+    def __dump_message(message: Dict[str, Any]) -> str:
+        payload = {key: value for key, value in message.items() if key not in ("id", "attempts")}
+        msg_type: Optional[NotificationType] = message.get("type")
+        payload["type"] = msg_type.name if msg_type else None
+        return json.dumps(payload, ensure_ascii=False)
+
+    @staticmethod
+    def __load_message(row_id: int, payload: str, attempts: int) -> Dict[str, Any]:
+        message = json.loads(payload)
+        message["type"] = NotificationType.__members__.get(message.get("type") or "")
+        message["id"] = row_id
+        message["attempts"] = attempts
+        return message
+
+    def __outbox_add(self, message: Dict[str, Any]):
+        with self._outbox_lock:
+            if not self._outbox:
+                return
+            cursor = self._outbox.execute("INSERT INTO outbox (payload, next_at, priority) VALUES (?, ?, ?)",
+                                          (self.__dump_message(message), time.time(),
+                                           self.__priority(message.get("type"))))
+            message["id"] = cursor.lastrowid
+            self._inflight.add(message["id"])
+
+    def __outbox_delete(self, message: Dict[str, Any]):
+        with self._outbox_lock:
+            if self._outbox and message.get("id"):
+                self._outbox.execute("DELETE FROM outbox WHERE id = ?", (message["id"],))
+
+    def __outbox_retry(self, message: Dict[str, Any], attempts: int, next_at: float, error: str):
+        with self._outbox_lock:
+            if self._outbox and message.get("id"):
+                self._outbox.execute("UPDATE outbox SET attempts = ?, next_at = ?, last_error = ? WHERE id = ?",
+                                     (attempts, next_at, error, message["id"]))
+
+    def __outbox_count(self) -> int:
+        with self._outbox_lock:
+            if not self._outbox:
+                return 0
+            return self._outbox.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def __outbox_due(self) -> List[Dict[str, Any]]:
+        """
+        取出到期且不在发送流程中的消息（重要消息优先），并标记为发送中
+        """
+        with self._outbox_lock:
+            if not self._outbox:
+                return []
+            rows = self._outbox.execute("SELECT id, payload, attempts FROM outbox WHERE next_at <= ? "
+                                        "ORDER BY priority DESC, next_at LIMIT ?", (time.time(), self._queue_size)).fetchall()
+            messages = []
+            for row_id, payload, attempts in rows:
+                if row_id in self._inflight:
+                    continue
+                self._inflight.add(row_id)
+                messages.append(self.__load_message(row_id, payload, attempts))
+            return messages
+
+    def __retry_loop(self, stop_event: threading.Event):
+        """
+        定期把到期的待重试消息放回发送队列；启动时先补发上次退出前未发送成功的消息
+        """
+        while not stop_event.is_set():
+            try:
+                due = self.__outbox_due()
+                for index, message in enumerate(due):
+                    message_queue = self._queue
+                    if stop_event.is_set() or not message_queue:
+                        self.__release(message)
+                        continue
+                    try:
+                        message_queue.put_nowait(message)
+                        self._metrics.observe_queue(message_queue.qsize())
+                    except queue.Full:
+                        # 只占用空闲位置，不挤掉尚未写入发件箱的新消息，其余的下一轮再放入
+                        for rest in due[index:]:
+                            self.__release(rest)
+                        break
+            except Exception as err:
+                logger.error(f"PushPlus发件箱读取失败，{str(err)}")
+            stop_event.wait(self.RETRY_POLL)
 
     def stop_service(self):
         """
         退出插件
         """
-        pass
\ No newline at end of file
+        self.__flush_all()
+        if self._retry_stop:
+            self._retry_stop.set()
+            if self._retrier:
+                self._retrier.join(timeout=self.DRAIN_TIMEOUT)
+            self._retry_stop = None
+            self._retrier = None
+        late: List[threading.Thread] = []
+        if self._queue:
+            message_queue, workers = self._queue, self._workers
+            # 不再接收新消息，已入队的消息发送完毕后线程退出
+            self._queue = None
+            self._workers = []
+            self._worker_stop.set()
+            deadline = time.time() + self.DRAIN_TIMEOUT
+            for worker in workers:
+                worker.join(timeout=max(0.0, deadline - time.time()))
+            # 未来得及发送的消息写入发件箱，下次启动后继续发送
+            remaining = 0
+            while True:
+                try:
+                    message = message_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if message.get("id"):
+                    self.__release(message)
+                elif self.__spill(message):
+                    # 按路由拆分为各目标的记录再保存，重启后每个目标都能收到
+                    remaining += 1
+            if remaining:
+                logger.warn(f"PushPlus发送队列未能在{self.DRAIN_TIMEOUT}秒内发送完毕，{remaining} 条消息已保存，下次启动后继续发送")
+            # 再等待一个请求超时，让正在进行的请求结束
+            deadline = time.time() + self.REQUEST_TIMEOUT
+            for worker in workers:
+                worker.join(timeout=max(0.0, deadline - time.time()))
+            late = [worker for worker in workers if worker.is_alive()]
+        if self._fanout:
+            self._fanout.shutdown(wait=False)
+            self._fanout = None
+        if late:
+            # 不阻塞保存配置：发件箱和会话留给仍在发送的线程，它们结束后再关闭，
+            # 期间发送成功的记录照常删除，不会在下次启动后重复发送
+            logger.warn(f"PushPlus有 {len(late)} 个发送线程仍在等待接口响应，结束后再关闭发件箱")
+            self._late_workers = late
+            threading.Thread(target=self.__close_later, args=(late, self._outbox, self._session),
+                             name="PushPlusMsgs-close", daemon=True).start()
+            return
+        with self._outbox_lock:
+            if self._outbox:
+                self._outbox.close()
+                self._outbox = None
+        if self._session:
+            self._session.close()
+            self._session = None
+
+    def __close_later(self, workers: List[threading.Thread], outbox: Optional[sqlite3.Connection],
+                      session: Optional[requests.Session]):
+        """
+        等待退出时仍在发送的线程结束后关闭旧的发件箱连接和会话
+        """
+        for worker in workers:
+            worker.join()
+        # 插件重新启用后已换成新的连接和会话，否则一并清空
+        with self._outbox_lock:
+            if outbox and self._outbox is outbox:
+                self._outbox = None
+            if outbox:
+                outbox.close()
+        if session:
+            if self._session is session:
+                self._session = None
+            session.close()
@@ -0,0 +1,217 @@
+"""
+PushPlusMsgs 突发负载基准测试
+
+在本地启动模拟 PushPlus /send 接口的服务（可配置延迟、错误码、限流），按指定速率触发
+NoticeMessage 事件，统计事件处理耗时、投递吞吐量和丢失数量，全程离线运行。
+
+在 MoviePilot 根目录执行：
+    python -m app.plugins.pushplusmsgs.benchmark --events 2000 --rate 500 --latency 200
+"""
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.core.event import Event
+from app.schemas.types import NotificationType
+
+from . import PushPlusMsgs
+
+
+class StubServer:
+    """
+    模拟 PushPlus /send 接口，记录每次成功投递的消息标题
+    """
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, error_code: int, rate_limit: int):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.rate_limit = rate_limit
+        self.requests = 0
+        self.limited = 0
+        self.errors = 0
+        self.delivered: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._window_start = 0.0
+        self._window_count = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/send"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __limited(self) -> bool:
+        """
+        按秒计数的固定窗口限流
+        """
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start = now
+            self._window_count = 0
+        self._window_count += 1
+        return self._window_count > self.rate_limit
+
+    def reply(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            self.requests += 1
+            if self.__limited():
+                self.limited += 1
+                return 429, {"code": 429, "msg": "请求过于频繁"}
+            if self.error_rate and random.random() < self.error_rate:
+                self.errors += 1
+                return 200, {"code": self.error_code, "msg": "模拟错误"}
+            self.delivered.setdefault(body.get("title"), time.monotonic())
+        return 200, {"code": 200, "msg": "请求成功", "data": "stub"}
+
+    def __handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                delay = stub.latency + random.uniform(0, stub.jitter)
+                if delay:
+                    time.sleep(delay)
+                status, payload = stub.reply(body)
+                out = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+        return Handler
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def fire_events(plugin: PushPlusMsgs, count: int, rate: float, threads: int, types: List[NotificationType]
+                ) -> Tuple[List[float], Dict[str, float], float]:
+    """
+    按速率触发事件，返回每次事件处理耗时、各标题的触发时间和总触发耗时
+    """
+    latencies: List[float] = []
+    fired: Dict[str, float] = {}
+    lock = threading.Lock()
+
+    def fire(index: int):
+        title = f"bench-{index}"
+        event = Event(event_data={"type": types[index % len(types)], "title": title, "text": f"第 {index} 条"})
+        started = time.monotonic()
+        plugin.send(event)
+        elapsed = time.monotonic() - started
+        with lock:
+            latencies.append(elapsed)
+            fired[title] = started
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for index in range(count):
+            if rate:
+                delay = started + index / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(fire, index)
+    return latencies, fired, time.monotonic() - started
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubServer(latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate,
+                      error_code=args.error_code, rate_limit=args.rate_limit)
+    stub.start()
+    data_path = Path(tempfile.mkdtemp(prefix="pushplus-bench-"))
+    plugin = PushPlusMsgs()
+    plugin.SEND_URL = stub.url
+    plugin.get_data_path = lambda: data_path
+    # 默认不限每日额度，只测量投递链路本身
+    config = {"enabled": True, "token": "benchmark", "msgtypes": [], "daily_limit": 0}
+    config.update(json.loads(args.config or "{}"))
+    plugin.init_plugin(config)
+    types = [NotificationType.Download, NotificationType.Organize, NotificationType.Manual]
+    try:
+        latencies, fired, fire_time = fire_events(plugin, args.events, args.rate, args.threads, types)
+        # 全部投递，或队列和发件箱清空且接口半秒内没有新请求时结束等待
+        deadline = time.monotonic() + args.drain
+        idle_since, last_requests = time.monotonic(), -1
+        while time.monotonic() < deadline and len(stub.delivered) < len(fired):
+            time.sleep(0.05)
+            metrics = plugin.api_metrics().data
+            if stub.requests != last_requests or metrics.get("queue_depth") or metrics.get("outbox_pending"):
+                idle_since, last_requests = time.monotonic(), stub.requests
+            elif time.monotonic() - idle_since > 0.5:
+                break
+        metrics = plugin.api_metrics().data
+    finally:
+        plugin.stop_service()
+        stub.stop()
+
+    delivered = {title: at for title, at in stub.delivered.items() if title in fired}
+    first = min(fired.values()) if fired else 0
+    last = max(delivered.values()) if delivered else first
+    delays = [at - fired[title] for title, at in delivered.items()]
+    return {
+        "events": len(fired),
+        "fire_seconds": round(fire_time, 3),
+        "handler_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(max(latencies, default=0) * 1000, 3),
+        },
+        "delivered": len(delivered),
+        "lost": len(fired) - len(delivered),
+        "outbox_pending": metrics.get("outbox_pending") if isinstance(metrics, dict) else None,
+        "throughput_per_second": round(len(delivered) / (last - first), 2) if last > first else 0,
+        "delivery_seconds": {
+            "p50": round(percentile(delays, 50), 3),
+            "p95": round(percentile(delays, 95), 3),
+            "max": round(max(delays, default=0), 3),
+        },
+        "stub": {"requests": stub.requests, "rate_limited": stub.limited, "errors": stub.errors},
+        "plugin": metrics.get("totals") if isinstance(metrics, dict) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PushPlusMsgs 突发负载基准测试")
+    parser.add_argument("--events", type=int, default=1000, help="触发的事件数量")
+    parser.add_argument("--rate", type=float, default=0, help="每秒触发的事件数，0 表示不限速")
+    parser.add_argument("--threads", type=int, default=8, help="并发触发事件的线程数")
+    parser.add_argument("--latency", type=float, default=100, help="模拟接口的响应延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0, help="响应延迟的随机抖动上限（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0, help="模拟接口返回错误码的比例")
+    parser.add_argument("--error-code", type=int, default=500, help="模拟接口返回的错误码")
+    parser.add_argument("--rate-limit", type=int, default=0, help="模拟接口每秒允许的请求数，超出返回 HTTP 429")
+    parser.add_argument("--drain", type=float, default=30, help="触发结束后等待投递完成的最长秒数")
+    parser.add_argument("--config", default="", help="覆盖插件配置的 JSON，如 '{\"workers\": 8}'")
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()